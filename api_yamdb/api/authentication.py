@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import User
+
+CLAIM_FIELDS = ('username', 'role', 'is_superuser', 'is_staff', 'is_active')
+VERSION_CLAIM = 'ver'
+VERSION_KEY = 'jwt:version:{}'
+# версия удалённого пользователя: не совпадает ни с одним токеном
+DELETED = -1
+
+
+class RoleAccessToken(AccessToken):
+    '''Access-токен, в claims которого лежат роль и флаги пользователя.'''
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in CLAIM_FIELDS:
+            token[field] = getattr(user, field)
+        token[VERSION_CLAIM] = user.token_version
+        cache.set(
+            VERSION_KEY.format(user.pk), user.token_version,
+            settings.JWT_VERSION_CACHE_TTL)
+        return token
+
+
+def token_version(user_id):
+    '''Текущая версия токенов пользователя. Хранится в User, кэш -
+    только слой чтения: вытеснение записи из кэша не возвращает
+    силу отозванным токенам.'''
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        versions = list(User.objects.filter(pk=user_id).values_list(
+            'token_version', flat=True))
+        version = versions[0] if versions else DELETED
+        cache.set(key, version, settings.JWT_VERSION_CACHE_TTL)
+    return version
+
+
+def forget_token_version(user_id):
+    key = VERSION_KEY.format(user_id)
+    cache.delete(key)
+    # до коммита другие запросы могли снова закэшировать прежнюю версию
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def revoke_tokens(user_id):
+    '''Отзывает все выданные токены пользователя и возвращает новую
+    версию токенов.'''
+    User.objects.filter(pk=user_id).update(
+        token_version=F('token_version') + 1)
+    forget_token_version(user_id)
+    return User.objects.filter(pk=user_id).values_list(
+        'token_version', flat=True).get()
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    '''JWT-аутентификация без запроса строки пользователя из БД.
+    request.user собирается из claims токена: этого хватает классам
+    разрешений и для подстановки автора. Токены без claims роли,
+    выданные до появления RoleAccessToken, проверяются по БД.'''
+
+    def get_user(self, validated_token):
+        if not all(field in validated_token for field in CLAIM_FIELDS):
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification'))
+        if validated_token.get(VERSION_CLAIM) != token_version(user_id):
+            raise AuthenticationFailed(
+                _('Token is invalid or expired'), code='token_not_valid')
+        if not validated_token['is_active']:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive')
+        user = User(
+            **{api_settings.USER_ID_FIELD: user_id},
+            **{field: validated_token[field] for field in CLAIM_FIELDS}
+        )
+        user._state.adding = False
+        return user
@@ -0,0 +1,552 @@
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.signals import bulk_changed
+from . import compression
+from .authentication import RoleAccessToken
+
+# Размеры синтетических данных: отзывов на произведение
+# и комментариев на отзыв
+SCALES = {
+    'tiny': {'users': 5, 'categories': 2, 'genres': 3, 'titles': 10,
+             'reviews': 2, 'comments': 2},
+    'small': {'users': 50, 'categories': 5, 'genres': 10, 'titles': 200,
+              'reviews': 5, 'comments': 2},
+    'medium': {'users': 200, 'categories': 10, 'genres': 20, 'titles': 2000,
+               'reviews': 10, 'comments': 3},
+    'large': {'users': 1000, 'categories': 20, 'genres': 40,
+              'titles': 20000, 'reviews': 20, 'comments': 5},
+}
+BATCH_SIZE = 5000
+# У первого произведения отзывы всех пользователей, у его первого
+# отзыва комментариев во столько раз больше обычного: длинные списки,
+# как у популярных произведений
+POPULAR_COMMENTS = 100
+WORDS = ('тихий', 'дон', 'война', 'мир', 'мастер', 'море', 'город',
+         'ночь', 'сердце', 'дорога', 'звезда', 'остров', 'песня', 'зима')
+PERCENTILES = (50, 95, 99)
+
+
+def insert(model, objects):
+    '''bulk_create по пачкам, не собирая все объекты в памяти.'''
+    objects = iter(objects)
+    while True:
+        chunk = list(islice(objects, BATCH_SIZE))
+        if not chunk:
+            return
+        model.objects.bulk_create(chunk)
+
+
+def ids(model):
+    # SQLite не возвращает id из bulk_create, поэтому читаем их заново
+    return list(model.objects.order_by('id').values_list('id', flat=True))
+
+
+def seed(scale, seed=0):
+    '''Заполняет базу через модели и возвращает данные для сценариев.'''
+    rng = random.Random(seed)
+    size = SCALES[scale]
+    insert(User, (
+        User(username=f'user{i}', email=f'user{i}@yamdb.ru')
+        for i in range(size['users'])
+    ))
+    insert(Category, (
+        Category(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(size['categories'])
+    ))
+    insert(Genre, (
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(size['genres'])
+    ))
+    users, categories, genres = ids(User), ids(Category), ids(Genre)
+    insert(Title, (
+        Title(
+            name=' '.join(rng.sample(WORDS, 2)).capitalize() + f' {i}',
+            year=rng.randint(1900, 2020),
+            category_id=rng.choice(categories),
+            description=' '.join(rng.sample(WORDS, 5)),
+        )
+        for i in range(size['titles'])
+    ))
+    titles = ids(Title)
+    insert(Title.genre.through, (
+        Title.genre.through(title_id=title_id, genre_id=genre_id)
+        for title_id in titles
+        for genre_id in rng.sample(genres, rng.randint(1, 3))
+    ))
+    insert(Review, (
+        Review(
+            title_id=title_id,
+            author_id=users[(number + i) % len(users)],
+            text=' '.join(rng.choices(WORDS, k=20)),
+            score=rng.randint(1, 10),
+        )
+        for number, title_id in enumerate(titles)
+        for i in range(
+            len(users) if number == 0 else min(size['reviews'], len(users)))
+    ))
+    popular = Review.objects.filter(title_id=titles[0]).order_by('id')[0].id
+    insert(Comment, (
+        Comment(
+            review_id=review_id,
+            author_id=rng.choice(users),
+            text=' '.join(rng.choices(WORDS, k=10)),
+        )
+        for review_id in Review.objects.order_by('id').values_list(
+            'id', flat=True).iterator()
+        for _ in range(size['comments'] * (
+            POPULAR_COMMENTS if review_id == popular else 1))
+    ))
+    Title.objects.rebuild_rating()
+    Title.objects.update_search_vector()
+    for model in (User, Category, Genre, Title, Review, Comment):
+        bulk_changed.send(sender=model)
+    reader = User.objects.get(pk=users[0])
+    return {
+        'titles': titles,
+        'genres': list(Genre.objects.values_list('slug', flat=True)),
+        'popular': (titles[0], popular),
+        # фильтр, под который точно есть произведения
+        'title_filter': dict(zip(
+            ('category', 'year'),
+            Title.objects.values_list('category__slug', 'year').get(
+                pk=titles[0]))),
+        'reviews': list(Review.objects.order_by('?').values_list(
+            'title_id', 'id')[:1000]),
+        'reader': {
+            'username': reader.username,
+            'confirmation_code': default_token_generator.make_token(reader),
+        },
+        'token': str(RoleAccessToken.for_user(reader)),
+    }
+
+
+# Сценарий возвращает (метод, путь, параметры, нужен ли токен)
+SCENARIOS = {
+    'titles_list': lambda rng, data: (
+        'get', '/api/v1/titles/',
+        {'limit': 10, 'offset': rng.randrange(len(data['titles']))}, False),
+    # с токеном: кэш ответов только для анонимов, замеряется сериализация
+    'titles_page': lambda rng, data: (
+        'get', '/api/v1/titles/',
+        {'limit': 100, 'offset': rng.randrange(len(data['titles']))}, True),
+    'title_detail': lambda rng, data: (
+        'get', f'/api/v1/titles/{rng.choice(data["titles"])}/', {}, False),
+    'titles_filter': lambda rng, data: (
+        'get', '/api/v1/titles/',
+        {'genre': rng.choice(data['genres']),
+         'year': rng.randint(1900, 2020)}, False),
+    'titles_search': lambda rng, data: (
+        'get', '/api/v1/titles/', {'search': rng.choice(WORDS)[:4]}, False),
+    'reviews_list': lambda rng, data: (
+        'get', f'/api/v1/titles/{rng.choice(data["titles"])}/reviews/',
+        {}, True),
+    'comments_list': lambda rng, data: (
+        'get', '/api/v1/titles/{}/reviews/{}/comments/'.format(
+            *rng.choice(data['reviews'])), {}, True),
+    'auth_token': lambda rng, data: (
+        'post', '/api/v1/auth/token/', data['reader'], False),
+}
+
+
+def percentile(ordered, value):
+    '''Перцентиль методом ближайшего ранга по отсортированной выборке.'''
+    rank = max(1, -(-len(ordered) * value // 100))
+    return ordered[int(rank) - 1]
+
+
+def summary(latencies, wall_time, queries=None):
+    ordered = sorted(latencies)
+    result = {
+        'requests': len(ordered),
+        'rps': round(len(ordered) / wall_time, 1),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+    }
+    for value in PERCENTILES:
+        result[f'p{value}_ms'] = round(percentile(ordered, value) * 1000, 2)
+    if queries:
+        result['queries'] = max(queries)
+    return result
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def run_client(name, iterations, data, seed=0):
+    '''Последовательные запросы через DRF APIClient с подсчётом SQL.'''
+    rng = random.Random(seed)
+    client = APIClient()
+    latencies, queries = [], []
+    for _ in range(iterations):
+        method, path, params, auth = SCENARIOS[name](rng, data)
+        if auth:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {data["token"]}')
+        else:
+            client.credentials()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            if method == 'get':
+                response = client.get(path, params)
+            else:
+                response = client.post(path, params, format='json')
+            latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise BenchmarkError(f'{name}: {path} {response.status_code}')
+        queries.append(len(context.captured_queries))
+    return summary(latencies, sum(latencies), queries)
+
+
+def run_http(name, iterations, data, base_url, concurrency, seed=0):
+    '''Параллельные HTTP-запросы к запущенному серверу.'''
+    rng = random.Random(seed)
+    requests = [SCENARIOS[name](rng, data) for _ in range(iterations)]
+
+    def send(request):
+        method, path, params, auth = request
+        url, body = base_url + path, None
+        headers = {'Content-Type': 'application/json'}
+        if auth:
+            headers['Authorization'] = f'Bearer {data["token"]}'
+        if method == 'get':
+            url += '?' + urlencode(params)
+        else:
+            body = json.dumps(params).encode()
+        started = time.perf_counter()
+        with urllib.request.urlopen(urllib.request.Request(
+                url, data=body, headers=headers, method=method.upper())
+        ) as response:
+            response.read()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(send, requests))
+    return summary(latencies, time.perf_counter() - started)
+
+
+# Пути чтения списков: values() и api.readers или ModelSerializer
+READ_PATHS = {
+    'values': True,
+    'serializer': False,
+}
+
+
+# Типичные страницы для замера сжатия: (название, путь, параметры)
+COMPRESSION_PAGES = (
+    ('titles_10', lambda data: '/api/v1/titles/', {'limit': 10}),
+    ('titles_100', lambda data: '/api/v1/titles/', {'limit': 100}),
+    ('reviews', lambda data: '/api/v1/titles/{}/reviews/'.format(
+        data['reviews'][0][0]), {}),
+    ('comments', lambda data: '/api/v1/titles/{}/reviews/{}/comments/'.format(
+        *data['reviews'][0]), {}),
+)
+COMPRESSION_LEVELS = (('gzip', 1), ('gzip', 6), ('gzip', 9), ('br', 4),
+                      ('br', 5), ('br', 11))
+
+
+def compression_pages(data):
+    '''Несжатые тела типичных ответов API и redoc.yaml.'''
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {data["token"]}')
+    pages = {}
+    for name, path, params in COMPRESSION_PAGES:
+        response = client.get(
+            path(data), params, HTTP_ACCEPT_ENCODING='identity')
+        if response.status_code >= 400:
+            raise BenchmarkError(f'{name}: {response.status_code}')
+        pages[name] = response.content
+    redoc = os.path.join(settings.STATIC_ROOT, 'redoc.yaml')
+    if os.path.exists(redoc):
+        with open(redoc, 'rb') as source:
+            pages['redoc.yaml'] = source.read()
+    return pages
+
+
+def run_compression(data, repeat=20):
+    '''Размер после сжатия и время процессора на одно сжатие
+    для каждой страницы и каждого уровня.'''
+    results = {}
+    available = compression.encoders()
+    for name, content in compression_pages(data).items():
+        result = {'bytes': len(content)}
+        for coding, level in COMPRESSION_LEVELS:
+            if coding not in available:
+                continue
+            started = time.process_time()
+            for _ in range(repeat):
+                compressed = compression.compress(coding, content, level)
+            cpu = (time.process_time() - started) / repeat
+            result[f'{coding}-{level}'] = {
+                'bytes': len(compressed),
+                'saved_pct': round(
+                    100 - len(compressed) * 100 / len(content), 1),
+                'cpu_ms': round(cpu * 1000, 3),
+            }
+        results[name] = result
+    return results
+
+
+# Главные запросы эндпоинтов для проверки планов: (название, путь
+# и параметры, таблица, из которой читается страница). Категории
+# и жанры не проверяются: в таблицах десятки строк, их дешевле
+# прочитать целиком. Список пользователей не сортируется, LIMIT
+# читает первые строки таблицы, а поиск по части имени индекс B-tree
+# не ускоряет.
+PLAN_CHECKS = (
+    ('titles_list', lambda data: ('/api/v1/titles/', {'limit': 10}),
+     'reviews_title'),
+    ('titles_filter', lambda data: ('/api/v1/titles/', data['title_filter']),
+     'reviews_title'),
+    ('reviews_list', lambda data: (
+        f'/api/v1/titles/{data["popular"][0]}/reviews/', {}),
+     'reviews_review'),
+    ('reviews_cursor', lambda data: (
+        f'/api/v1/titles/{data["popular"][0]}/reviews/',
+        {'pagination': 'cursor'}),
+     'reviews_review'),
+    ('comments_list', lambda data: (
+        '/api/v1/titles/{}/reviews/{}/comments/'.format(*data['popular']),
+        {}),
+     'reviews_comment'),
+    ('comments_cursor', lambda data: (
+        '/api/v1/titles/{}/reviews/{}/comments/'.format(*data['popular']),
+        {'pagination': 'cursor'}),
+     'reviews_comment'),
+    ('leaderboard', lambda data: ('/api/v1/leaderboards/', {'limit': 100}),
+     'reviews_titleranking'),
+    ('leaderboard_genre', lambda data: (
+        '/api/v1/leaderboards/',
+        {'kind': 'reviews', 'genre': data['genres'][0]}),
+     'reviews_titleranking'),
+)
+SORT_NODES = ('Sort', 'Incremental Sort')
+# Сортировка нескольких строк после фильтра по индексу дешевле
+# чтения в порядке индекса, проблемой считаются только большие
+PLAN_SORT_ROWS = 100
+
+
+def main_query(queries, table):
+    '''Запрос страницы: последний SELECT из table с ORDER BY.'''
+    for query in reversed(queries):
+        sql = query['sql']
+        if (sql.startswith('SELECT') and f'FROM "{table}"' in sql
+                and 'ORDER BY' in sql):
+            return sql
+    return None
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+def describe(node):
+    text = node['Node Type']
+    if 'Index Name' in node:
+        text += f' using {node["Index Name"]}'
+    if 'Relation Name' in node:
+        text += f' on {node["Relation Name"]}'
+    return text
+
+
+def explain(sql, table):
+    '''План запроса (только PostgreSQL) и найденные в нём проблемы:
+    последовательное чтение table и сортировка вместо индекса.'''
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes = list(plan_nodes(plan[0]['Plan']))
+    problems = [
+        describe(node) for node in nodes
+        if node['Node Type'] in SORT_NODES
+        and node['Plan Rows'] > PLAN_SORT_ROWS
+        or node['Node Type'] == 'Seq Scan'
+        and node.get('Relation Name') == table
+    ]
+    return [describe(node) for node in nodes], problems
+
+
+def run_plans(data):
+    '''Планы главных запросов PLAN_CHECKS на текущих данных.'''
+    client = APIClient()
+    # списки произведений кэшируются только для анонимов
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {data["token"]}')
+    results = {}
+    for name, request, table in PLAN_CHECKS:
+        path, params = request(data)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path, params)
+        if response.status_code >= 400:
+            raise BenchmarkError(f'{name}: {response.status_code}')
+        sql = main_query(queries.captured_queries, table)
+        if sql is None:
+            raise BenchmarkError(f'{name}: нет запроса к {table}')
+        nodes, problems = explain(sql, table)
+        results[name] = {'plan': nodes, 'problems': problems}
+    return results
+
+
+# Серверы для сравнения моделей воркеров при одинаковом числе процессов
+SERVERS = {
+    'sync': ('api_yamdb.wsgi:application', 'sync'),
+    'gthread': ('api_yamdb.wsgi:application', 'gthread'),
+    'asgi': ('api_yamdb.asgi:application', 'uvicorn.workers.UvicornWorker'),
+}
+UNLIMITED_RATE = '1000000000/day'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def process_rss(pid):
+    '''Резидентная память процесса и его потомков в КБ (Linux /proc).'''
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            rss = next(
+                int(line.split()[1]) for line in status
+                if line.startswith('VmRSS:')
+            )
+        with open(f'/proc/{pid}/task/{pid}/children') as children:
+            return rss + sum(
+                process_rss(int(child)) for child in children.read().split())
+    except (OSError, StopIteration):
+        return 0
+
+
+@contextmanager
+def gunicorn(server, workers, threads):
+    '''Запускает gunicorn с тестовой базой и локальным кэшем в каждом
+    воркере; возвращает базовый URL и pid мастер-процесса.'''
+    app, worker_class = SERVERS[server]
+    port = free_port()
+    env = dict(
+        os.environ,
+        DB_NAME=connection.settings_dict['NAME'],
+        CACHE_BACKEND='django.core.cache.backends.locmem.LocMemCache',
+        METRICS_SAMPLE_RATE='0',
+        THROTTLE_RATE_USER=UNLIMITED_RATE,
+        THROTTLE_RATE_ANON=UNLIMITED_RATE,
+        THROTTLE_RATE_LOW_REQUEST=UNLIMITED_RATE,
+        ASGI_THREADS=str(threads),
+    )
+    process = subprocess.Popen(
+        # gunicorn 20.0 не запускается через -m
+        [sys.executable, '-c', 'from gunicorn.app.wsgiapp import run; run()',
+         app,
+         '--config', os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'),
+         '--bind', f'127.0.0.1:{port}',
+         '--worker-class', worker_class,
+         '--workers', str(workers),
+         '--threads', str(threads if server == 'gthread' else 1),
+         '--worker-tmp-dir', '/tmp'],
+        cwd=settings.BASE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_for(base_url, process)
+        yield base_url, process.pid
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def wait_for(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise BenchmarkError(
+                f'gunicorn завершился с кодом {process.returncode}')
+        try:
+            urllib.request.urlopen(base_url + '/api/v1/categories/').close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise BenchmarkError(f'{base_url} не отвечает {timeout} с')
+
+
+@contextmanager
+def isolated_settings():
+    '''Свой кэш в памяти процесса и лимиты запросов без ограничений:
+    данные бенчмарка не должны попасть в общий кэш рабочего сервиса.'''
+    rest_framework = dict(settings.REST_FRAMEWORK)
+    rest_framework['DEFAULT_THROTTLE_RATES'] = {
+        scope: '1000000000/day'
+        for scope in rest_framework['DEFAULT_THROTTLE_RATES']
+    }
+    with override_settings(
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'benchmark',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }},
+        THROTTLE_CACHE='default',
+        REST_FRAMEWORK=rest_framework,
+        METRICS_SAMPLE_RATE=0,
+    ):
+        yield
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = 'unknown'
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+    }
+
+
+def compare(baseline, current, threshold):
+    '''Строки сравнения и список регрессий: рост p95 больше threshold
+    процентов или рост числа SQL-запросов.'''
+    rows, regressions = [], []
+    for key, result in current['results'].items():
+        old = baseline['results'].get(key)
+        if old is None:
+            continue
+        change = (result['p95_ms'] / old['p95_ms'] - 1) * 100
+        row = (f'{key}: p95 {old["p95_ms"]} -> {result["p95_ms"]} ms '
+               f'({change:+.0f}%)')
+        if 'queries' in result and 'queries' in old:
+            row += f', запросов {old["queries"]} -> {result["queries"]}'
+            if result['queries'] > old['queries']:
+                regressions.append(key)
+        if change > threshold and key not in regressions:
+            regressions.append(key)
+        rows.append(row)
+    return rows, regressions
@@ -0,0 +1,275 @@
+from django.conf import settings
+from django.db import connections, router, transaction
+from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
+
+from reviews.models import Category, Genre, Title
+from reviews.signals import bulk_changed
+from .serializers import (CategoryBulkSerializer, GenreBulkSerializer,
+                          TitleBulkSerializer)
+
+GenreTitle = Title.genre.through
+DUPLICATE = 'Повторяется в пакете.'
+NOT_FOUND = serializers.SlugRelatedField.default_error_messages[
+    'does_not_exist']
+
+
+def check_items(items):
+    '''Ошибка формата всего пакета или None.'''
+    if not isinstance(items, list):
+        return serializers.ListSerializer.default_error_messages[
+            'not_a_list'].format(input_type=type(items).__name__)
+    if not items:
+        return serializers.ListSerializer.default_error_messages['empty']
+    if len(items) > settings.BULK_MAX_ITEMS:
+        return f'Не больше {settings.BULK_MAX_ITEMS} объектов за запрос.'
+    return None
+
+
+class BulkWriter:
+    '''Проверяет пакет объектов целиком и записывает его одной
+    транзакцией. Каждый объект проверяется сериализатором без запросов
+    к базе, ссылки и уникальность - одним запросом на весь пакет.
+    Ошибки собираются в errors по позициям пакета; если ошибка есть
+    хоть у одного объекта, не записывается ничего.'''
+    model = None
+    serializer_class = None
+    lookup_field = None
+    # поля, изменение которых меняет топы произведений
+    ranking_fields = ()
+
+    def __init__(self, partial=False):
+        self.partial = partial
+        self.serializer = self.serializer_class(partial=partial)
+        self.errors = []
+        self.instances = {}
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    def add_error(self, index, field, message):
+        self.errors[index].setdefault(field, []).append(message)
+
+    def validate(self, items):
+        self.errors = [{} for _ in items]
+        data = []
+        for index, item in enumerate(items):
+            try:
+                data.append(self.serializer.run_validation(item))
+            except serializers.ValidationError as error:
+                self.errors[index] = error.detail
+                data.append(None)
+        if self.partial:
+            self.check_lookups(data)
+        self.check_batch(data)
+        return data
+
+    def rows(self, data):
+        '''Позиции и данные объектов, прошедших проверку.'''
+        return [(index, row) for index, row in enumerate(data) if row]
+
+    def check_lookups(self, data):
+        '''При изменении находит все объекты пакета одним запросом.'''
+        field = self.lookup_field
+        seen = set()
+        for index, row in self.rows(data):
+            if field not in row:
+                self.add_error(
+                    index, field,
+                    serializers.Field.default_error_messages['required'])
+            elif row[field] in seen:
+                self.add_error(index, field, DUPLICATE)
+            else:
+                seen.add(row[field])
+        self.instances = self.get_queryset().in_bulk(seen, field_name=field)
+        for index, row in self.rows(data):
+            if field in row and row[field] not in self.instances:
+                self.add_error(index, field, NOT_FOUND.format(
+                    slug_name=field, value=row[field]))
+
+    def check_batch(self, data):
+        pass
+
+    def save(self, items):
+        '''Записанные объекты или None, если в пакете есть ошибки.'''
+        data = self.validate(items)
+        if any(self.errors):
+            return None
+        with transaction.atomic():
+            if self.partial:
+                objects = self.update(data)
+            else:
+                objects = self.create(data)
+            # bulk_create и bulk_update не отправляют post_save. У новых
+            # объектов нет отзывов, топы произведений они не меняют
+            bulk_changed.send(
+                sender=self.model, rankings=self.changes_rankings(data))
+        return objects
+
+    def changes_rankings(self, data):
+        return self.partial and any(
+            field in row for row in data for field in self.ranking_fields)
+
+    def represent(self, objects):
+        return self.serializer_class(objects, many=True).data
+
+    def create(self, data):
+        return self.model.objects.bulk_create(
+            [self.model(**row) for row in data])
+
+    def update(self, data):
+        objects = []
+        fields = set()
+        for row in data:
+            instance = self.instances[row[self.lookup_field]]
+            for field, value in row.items():
+                setattr(instance, field, value)
+            fields.update(row)
+            objects.append(instance)
+        fields.discard(self.lookup_field)
+        if fields:
+            self.model.objects.bulk_update(objects, fields)
+        return objects
+
+
+class CatalogWriter(BulkWriter):
+    '''Категории и жанры: создаются по slug и меняются по slug.'''
+    lookup_field = 'slug'
+
+    def check_batch(self, data):
+        if self.partial:
+            return
+        rows = self.rows(data)
+        taken = set(self.model.objects.filter(
+            slug__in=[row['slug'] for _, row in rows]
+        ).values_list('slug', flat=True))
+        for index, row in rows:
+            if row['slug'] in taken:
+                self.add_error(index, 'slug', UniqueValidator.message)
+            taken.add(row['slug'])
+
+
+class CategoryWriter(CatalogWriter):
+    model = Category
+    serializer_class = CategoryBulkSerializer
+
+
+class GenreWriter(CatalogWriter):
+    model = Genre
+    serializer_class = GenreBulkSerializer
+
+
+class TitleWriter(BulkWriter):
+    '''Произведения: жанры и категория задаются slug, как в API,
+    изменение - по id.'''
+    model = Title
+    serializer_class = TitleBulkSerializer
+    lookup_field = 'id'
+    ranking_fields = ('genre', 'category')
+
+    def get_queryset(self):
+        return Title.objects.defer('search_vector')
+
+    def resolve(self, model, field, data):
+        '''Словарь slug -> id для всех slug поля field в пакете.'''
+        rows = [(index, row) for index, row in self.rows(data)
+                if field in row]
+        slugs = {
+            slug for _, row in rows
+            for slug in (row[field] if field == 'genre' else [row[field]])
+        }
+        found = dict(model.objects.filter(slug__in=slugs).values_list(
+            'slug', 'id'))
+        for index, row in rows:
+            values = row[field] if field == 'genre' else [row[field]]
+            for slug in values:
+                if slug not in found:
+                    self.add_error(index, field, NOT_FOUND.format(
+                        slug_name='slug', value=slug))
+        return found
+
+    def check_batch(self, data):
+        self.genres = self.resolve(Genre, 'genre', data)
+        self.categories = self.resolve(Category, 'category', data)
+
+    def prepare(self, row):
+        '''Данные для полей модели: slug заменены на id.'''
+        row = dict(row)
+        row.pop('id', None)
+        genres = row.pop('genre', None)
+        if 'category' in row:
+            row['category_id'] = self.categories[row.pop('category')]
+        return row, genres
+
+    def create(self, data):
+        prepared = [self.prepare(row) for row in data]
+        titles = [Title(**row) for row, _ in prepared]
+        connection = connections[router.db_for_write(Title)]
+        if connection.features.can_return_ids_from_bulk_insert:
+            Title.objects.bulk_create(titles)
+        else:
+            # только для SQLite в тестах: bulk_create не возвращает id,
+            # а угадывать их по порядку вставки нельзя
+            for title in titles:
+                title.save(force_insert=True)
+        self.set_genres(titles, [genres for _, genres in prepared])
+        return titles
+
+    def update(self, data):
+        titles = []
+        fields = set()
+        genres = []
+        for row in data:
+            title = self.instances[row['id']]
+            values, title_genres = self.prepare(row)
+            for field, value in values.items():
+                setattr(title, field, value)
+            fields.update(values)
+            titles.append(title)
+            genres.append(title_genres)
+        if fields:
+            Title.objects.bulk_update(titles, fields)
+        if fields & {'name', 'description'}:
+            Title.objects.filter(
+                pk__in=[title.pk for title in titles]
+            ).update_search_vector()
+        self.set_genres(titles, genres)
+        return titles
+
+    def represent(self, titles):
+        '''Ответ как у TitlePostSerializer, но slug жанров и категорий
+        читаются двумя запросами на весь пакет, а не по произведению.'''
+        genres = {}
+        for title_id, slug in GenreTitle.objects.filter(
+                title_id__in=[title.pk for title in titles]
+        ).order_by('genre__name').values_list('title_id', 'genre__slug'):
+            genres.setdefault(title_id, []).append(slug)
+        categories = dict(Category.objects.filter(
+            pk__in={title.category_id for title in titles}
+        ).values_list('id', 'slug'))
+        return [
+            {
+                'id': title.pk,
+                'genre': genres.get(title.pk, []),
+                'category': categories.get(title.category_id),
+                'name': title.name,
+                'year': title.year,
+                'description': title.description,
+            }
+            for title in titles
+        ]
+
+    def set_genres(self, titles, genres):
+        '''Заменяет жанры произведений, для которых они переданы.'''
+        changed = [
+            (title, slugs) for title, slugs in zip(titles, genres)
+            if slugs is not None
+        ]
+        if self.partial and changed:
+            GenreTitle.objects.filter(
+                title_id__in=[title.pk for title, _ in changed]).delete()
+        GenreTitle.objects.bulk_create([
+            GenreTitle(title_id=title.pk, genre_id=self.genres[slug])
+            for title, slugs in changed
+            for slug in dict.fromkeys(slugs)
+        ])
@@ -0,0 +1,52 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'api:version:{}'
+RESPONSE_KEY = 'api:response:{}'
+
+
+def initial_version():
+    '''Новая версия всегда больше прежних, даже если ключ вытеснен.'''
+    return int(time.time() * 1000)
+
+
+def get_versions(namespaces):
+    '''Текущие версии пространств имён за одно обращение к кэшу.'''
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, initial_version(), None)
+            versions[key] = cache.get(key) or initial_version()
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*namespaces):
+    '''Инвалидирует все ответы, собранные из этих пространств имён.'''
+    for namespace in namespaces:
+        key = VERSION_KEY.format(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, initial_version(), None)
+
+
+def bump_versions_on_commit(*namespaces):
+    '''Откладывает инвалидацию до коммита, чтобы не закэшировать
+    данные транзакции, которая ещё не завершилась.'''
+    transaction.on_commit(lambda: bump_versions(*namespaces))
+
+
+def response_digest(request, namespaces):
+    '''Отпечаток ответа: адрес, формат и версии данных.
+    Служит и ETag, и ключом кэша ответов.'''
+    versions = get_versions(namespaces)
+    raw = '|'.join((
+        request.build_absolute_uri(),
+        request.accepted_media_type or '',
+        *map(str, versions),
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
@@ -0,0 +1,74 @@
+import gzip
+from io import BytesIO
+
+try:
+    import brotli
+except ImportError:
+    # без brotli ответы сжимаются только gzip
+    brotli = None
+
+# Типы, которые стоит сжимать: текст, JSON, YAML, JavaScript, SVG
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript',
+    'application/x-ndjson', 'application/yaml', 'image/svg+xml',
+)
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.json', '.yaml', '.yml', '.html', '.txt', '.svg',
+    '.map',
+)
+
+
+def gzip_compress(content, level):
+    # mtime=0: одинаковые ответы сжимаются в одинаковые байты
+    buffer = BytesIO()
+    with gzip.GzipFile(
+            mode='wb', compresslevel=level, fileobj=buffer, mtime=0) as out:
+        out.write(content)
+    return buffer.getvalue()
+
+
+def brotli_compress(content, quality):
+    return brotli.compress(content, quality=quality)
+
+
+def encoders():
+    '''Доступные кодировки в порядке предпочтения.'''
+    available = {}
+    if brotli is not None:
+        available['br'] = brotli_compress
+    available['gzip'] = gzip_compress
+    return available
+
+
+def accepted_encodings(header):
+    '''Кодировки из Accept-Encoding с их q.'''
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0
+        if coding.strip():
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(header):
+    '''Лучшая кодировка, которую принимает клиент, или None.'''
+    accepted = accepted_encodings(header)
+    for coding in encoders():
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def compress(coding, content, level):
+    return encoders()[coding](content, level)
+
+
+def is_compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import connection_stats
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    '''Закрывает постоянное соединение, которое не пережило простой
+    (перезапуск базы или pgbouncer, таймаут на сервере), чтобы запрос
+    открыл новое, а не упал. Django 2.2 этого не умеет.'''
+    connection_stats.count('requests')
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    now = time.monotonic()
+    for connection in connections.all():
+        idle_since = getattr(connection, 'idle_since', None)
+        if (connection.connection is None or connection.in_atomic_block
+                or idle_since is None
+                or now - idle_since < settings.DB_CONN_HEALTH_CHECK_DELAY):
+            continue
+        if not connection.is_usable():
+            connection_stats.count('broken')
+            connection.close()
+
+
+@receiver(request_finished)
+def mark_idle(sender, **kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.idle_since = now
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    connection_stats.count('opened')
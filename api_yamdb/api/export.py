@@ -0,0 +1,118 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from reviews.models import Comment, Review, Title
+from .filters import TitleFilter
+
+CHUNK_SIZE = 2000
+
+# Поля совпадают с форматом import_data, выгрузку можно загрузить обратно
+FIELDS = {
+    'titles': ('id', 'name', 'year', 'category', 'genre', 'description',
+               'rating', 'reviews_count'),
+    'reviews': ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    'comments': ('id', 'review_id', 'text', 'author', 'pub_date'),
+}
+
+
+def title_filter(params):
+    '''Те же фильтры, что у списка произведений в API.'''
+    return TitleFilter(params, queryset=Title.objects.order_by())
+
+
+def chunks(queryset, chunk_size):
+    '''Идёт по таблице серверным курсором, отдавая строки пачками.'''
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def title_rows(titles, chunk_size):
+    queryset = titles.values(
+        'id', 'name', 'year', 'description', 'rating', 'reviews_count',
+        'category__slug',
+    ).order_by('id')
+    through = Title.genre.through.objects
+    for chunk in chunks(queryset, chunk_size):
+        genres = {}
+        for title_id, slug in through.filter(
+                title_id__in=[row['id'] for row in chunk]).values_list(
+                    'title_id', 'genre__slug'):
+            genres.setdefault(title_id, []).append(slug)
+        for row in chunk:
+            row['category'] = row.pop('category__slug')
+            row['genre'] = genres.get(row['id'], [])
+            yield row
+
+
+def review_rows(titles, chunk_size):
+    queryset = Review.objects.filter(title__in=titles.values('id')).values(
+        'id', 'title_id', 'text', 'author__username', 'score', 'pub_date'
+    ).order_by('id')
+    for chunk in chunks(queryset, chunk_size):
+        for row in chunk:
+            row['author'] = row.pop('author__username')
+            yield row
+
+
+def comment_rows(titles, chunk_size):
+    queryset = Comment.objects.filter(
+        review__title__in=titles.values('id')).values(
+        'id', 'review_id', 'text', 'author__username', 'pub_date'
+    ).order_by('id')
+    for chunk in chunks(queryset, chunk_size):
+        for row in chunk:
+            row['author'] = row.pop('author__username')
+            yield row
+
+
+ROWS = {
+    'titles': title_rows,
+    'reviews': review_rows,
+    'comments': comment_rows,
+}
+
+
+class Echo:
+    '''Псевдо-файл для csv.writer: возвращает строку вместо записи.'''
+
+    def write(self, value):
+        return value
+
+
+def as_ndjson(rows, fields):
+    for row in rows:
+        yield json.dumps(
+            {field: row[field] for field in fields},
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False
+        ) + '\n'
+
+
+def as_csv(rows, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        if 'genre' in row:
+            row['genre'] = ','.join(row['genre'])
+        yield writer.writerow(
+            row[field].isoformat() if field == 'pub_date' else row[field]
+            for field in fields
+        )
+
+
+RENDERERS = {
+    'ndjson': as_ndjson,
+    'csv': as_csv,
+}
+
+
+def export(kind, output, titles, chunk_size=CHUNK_SIZE):
+    '''Ленивый генератор строк выгрузки: память не зависит от объёма.'''
+    return RENDERERS[output](ROWS[kind](titles, chunk_size), FIELDS[kind])
@@ -1,12 +1,18 @@
 from django_filters import rest_framework as filters
 from reviews.models import Title
 
+from .search import search_titles
+
 
 class TitleFilter(filters.FilterSet):
     genre = filters.CharFilter(field_name='genre__slug')
     category = filters.CharFilter(field_name='category__slug')
     name = filters.CharFilter(field_name='name', lookup_expr='icontains')
+    search = filters.CharFilter(method='search_titles')
 
     class Meta:
         model = Title
         fields = ('genre', 'category', 'name', 'year')
+
+    def search_titles(self, queryset, name, value):
+        return search_titles(queryset, value)
@@ -0,0 +1,253 @@
+import json
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.testcases import LiveServerThread, _StaticFilesHandler
+from django.test.utils import (override_settings, setup_databases,
+                               teardown_databases)
+
+from api import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный бенчмарк API на синтетических данных во временной '
+        'тестовой базе: перцентили задержки, пропускная способность '
+        'и число SQL-запросов по сценариям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', choices=tuple(benchmark.SCALES), default='small')
+        parser.add_argument(
+            '--driver', choices=('client', 'http', 'both'), default='both')
+        parser.add_argument(
+            '--read-path',
+            choices=tuple(benchmark.READ_PATHS) + ('both',),
+            default='values',
+            help=(
+                'Как клиентский драйвер читает списки: values() '
+                'или ModelSerializer; both - сравнить оба'
+            )
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=tuple(benchmark.SCENARIOS),
+            help='Можно указать несколько раз, по умолчанию все'
+        )
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Число параллельных клиентов HTTP-драйвера'
+        )
+        parser.add_argument(
+            '--server',
+            action='append',
+            choices=('live',) + tuple(benchmark.SERVERS),
+            help=(
+                'Сервер для HTTP-драйвера: live - поток Django в этом '
+                'процессе, sync/gthread/asgi - gunicorn с --workers '
+                'процессами и --concurrency потоками; можно несколько'
+            )
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Число процессов gunicorn, одинаковое для всех серверов'
+        )
+        parser.add_argument(
+            '--compression',
+            action='store_true',
+            help=(
+                'Вместо сценариев замерить сжатие типичных страниц: '
+                'размер и время процессора по кодировкам и уровням'
+            )
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help=(
+                'Вместо сценариев вывести планы главных запросов списков '
+                '(PostgreSQL) и завершиться с ошибкой при '
+                'последовательном чтении или сортировке'
+            )
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Сохранить результаты в JSON')
+        parser.add_argument(
+            '--compare', help='JSON прошлого запуска для сравнения')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=20,
+            help='Допустимый рост p95 в процентах при сравнении'
+        )
+
+    def handle(self, *args, **options):
+        old_config = setup_databases(
+            verbosity=0, interactive=False, keepdb=False)
+        try:
+            with benchmark.isolated_settings():
+                report = self.run(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(report, options)
+
+    def run(self, options):
+        data = benchmark.seed(options['scale'], options['seed'])
+        report = dict(
+            benchmark.environment(),
+            scale=options['scale'],
+            iterations=options['iterations'],
+            concurrency=options['concurrency'],
+            results={},
+        )
+        if options['compression']:
+            report['compression'] = benchmark.run_compression(data)
+            for name, result in report['compression'].items():
+                self.stdout.write(f'{name} {result}')
+            return report
+        if options['explain']:
+            self.explain(report, data)
+            return report
+        scenarios = options['scenario'] or tuple(benchmark.SCENARIOS)
+        drivers = (
+            ('client', 'http') if options['driver'] == 'both'
+            else (options['driver'],)
+        )
+        try:
+            if 'client' in drivers:
+                self.run_client(report, scenarios, data, options)
+            if 'http' in drivers:
+                for server in options['server'] or ('live',):
+                    self.run_server(report, server, scenarios, data, options)
+        except benchmark.BenchmarkError as error:
+            raise CommandError(error)
+        return report
+
+    def explain(self, report, data):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Планы запросов проверяются на PostgreSQL')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        try:
+            report['plans'] = benchmark.run_plans(data)
+        except benchmark.BenchmarkError as error:
+            raise CommandError(error)
+        failed = []
+        for name, result in report['plans'].items():
+            self.stdout.write(f'{name}: {" > ".join(result["plan"])}')
+            if result['problems']:
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                'Запросы без подходящего индекса: ' + ', '.join(failed))
+
+    def run_client(self, report, scenarios, data, options):
+        paths = (
+            tuple(benchmark.READ_PATHS) if options['read_path'] == 'both'
+            else (options['read_path'],)
+        )
+        for path in paths:
+            prefix = 'client' if len(paths) == 1 else f'client-{path}'
+            # ответы, закэшированные при замере другого пути, не в счёт
+            cache.clear()
+            with override_settings(FAST_READ_PATH=benchmark.READ_PATHS[path]):
+                for name in scenarios:
+                    self.record(
+                        report, f'{prefix}:{name}', benchmark.run_client(
+                            name, options['iterations'], data,
+                            options['seed'])
+                    )
+        if len(paths) > 1:
+            for name in scenarios:
+                fast, slow = (
+                    report['results'][f'client-{path}:{name}']['mean_ms']
+                    for path in paths
+                )
+                self.stdout.write(
+                    f'{name}: values() быстрее в {slow / fast:.2f} раза')
+
+    def run_server(self, report, server, scenarios, data, options):
+        with self.http_server(server, options) as (base_url, pid):
+            for name in scenarios:
+                self.record(report, f'{server}:{name}', benchmark.run_http(
+                    name, options['iterations'], data, base_url,
+                    options['concurrency'], options['seed']
+                ))
+            if pid is not None:
+                report.setdefault('servers', {})[server] = {
+                    'workers': options['workers'],
+                    'threads': (
+                        1 if server == 'sync' else options['concurrency']),
+                    'rss_mb': round(benchmark.process_rss(pid) / 1024, 1),
+                }
+                self.stdout.write(f'{server}: {report["servers"][server]}')
+
+    def record(self, report, key, result):
+        report['results'][key] = result
+        self.stdout.write(f'{key} {result}')
+
+    @contextmanager
+    def http_server(self, server, options):
+        if server != 'live':
+            if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+                raise CommandError(
+                    'gunicorn не видит тестовую базу SQLite в памяти, '
+                    'запустите бенчмарк с PostgreSQL')
+            with benchmark.gunicorn(
+                    server, options['workers'], options['concurrency']
+            ) as (base_url, pid):
+                yield base_url, pid
+            return
+        live = self.start_server()
+        try:
+            yield f'http://{live.host}:{live.port}', None
+        finally:
+            self.stop_server(live)
+
+    def start_server(self):
+        # in-memory SQLite видна только через соединение этого потока
+        shared = {
+            conn.alias: conn for conn in connections.all()
+            if conn.vendor == 'sqlite' and conn.is_in_memory_db()
+        }
+        for conn in shared.values():
+            conn.inc_thread_sharing()
+        server = LiveServerThread('localhost', _StaticFilesHandler, shared)
+        server.shared = shared
+        server.daemon = True
+        server.start()
+        server.is_ready.wait()
+        if server.error:
+            raise CommandError(server.error)
+        return server
+
+    def stop_server(self, server):
+        server.terminate()
+        server.join()
+        for conn in server.shared.values():
+            conn.dec_thread_sharing()
+
+    def compare(self, report, options):
+        with open(options['compare'], encoding='utf-8') as baseline:
+            baseline = json.load(baseline)
+        rows, regressions = benchmark.compare(
+            baseline, report, options['threshold'])
+        self.stdout.write(
+            f'Сравнение с {baseline.get("commit")} ({baseline["scale"]}):')
+        for row in rows:
+            self.stdout.write(row)
+        if regressions:
+            raise CommandError('Регрессии: ' + ', '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
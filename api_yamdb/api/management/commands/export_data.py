@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import export
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка произведений, отзывов или комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=tuple(export.FIELDS))
+        parser.add_argument(
+            '--output-format',
+            choices=tuple(export.RENDERERS),
+            default='ndjson'
+        )
+        parser.add_argument(
+            '--file',
+            help='Куда писать выгрузку, по умолчанию stdout'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=export.CHUNK_SIZE
+        )
+        for name in export.TitleFilter.base_filters:
+            parser.add_argument(
+                f'--{name}',
+                help=f'Фильтр произведений по {name}, как в API'
+            )
+
+    def handle(self, *args, **options):
+        filterset = export.title_filter({
+            name: options[name] for name in export.TitleFilter.base_filters
+            if options[name] is not None
+        })
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+        lines = export.export(
+            options['kind'],
+            options['output_format'],
+            filterset.qs,
+            options['chunk_size']
+        )
+        if options['file'] is None:
+            sys.stdout.writelines(lines)
+            return
+        with open(options['file'], 'w', encoding='utf-8', newline='') as out:
+            out.writelines(lines)
@@ -0,0 +1,141 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Границы корзин гистограмм: миллисекунды, число запросов, килобайты
+BUCKETS = {
+    'total_ms': (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    'db_ms': (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    'serialize_ms': (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+    'render_ms': (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+    'queries': (1, 2, 3, 5, 10, 20, 50, 100, 500),
+    'size_kb': (1, 4, 16, 64, 256, 1024, 4096),
+}
+
+
+class Histogram:
+    '''Счётчики по фиксированным корзинам: память и время записи
+    не зависят от числа наблюдений.'''
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def as_dict(self):
+        labels = [f'le_{bound}' for bound in self.bounds] + ['inf']
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'max': round(self.max, 3),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class Registry:
+    '''Метрики запросов в памяти процесса, по endpoint и методу.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = defaultdict(lambda: {
+                name: Histogram(bounds) for name, bounds in BUCKETS.items()
+            })
+
+    def record(self, endpoint, values):
+        with self.lock:
+            histograms = self.endpoints[endpoint]
+            for name, value in values.items():
+                histograms[name].observe(value)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                endpoint: {
+                    name: histogram.as_dict()
+                    for name, histogram in histograms.items()
+                }
+                for endpoint, histograms in sorted(self.endpoints.items())
+            }
+
+
+registry = Registry()
+
+
+class ConnectionStats:
+    '''Обслуженные запросы и открытые соединения с базой: доля
+    запросов без нового соединения показывает пользу CONN_MAX_AGE.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = defaultdict(int)
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def snapshot(self):
+        with self.lock:
+            counters = dict(self.counters)
+        requests = counters.get('requests', 0)
+        opened = counters.get('opened', 0)
+        counters['reuse_rate'] = (
+            round(max(0, 1 - opened / requests), 3) if requests else None)
+        return counters
+
+
+connection_stats = ConnectionStats()
+
+
+class QueryTimer:
+    '''execute_wrapper: считает запросы и время в базе данных.'''
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def measure(request, name):
+    '''Добавляет к метрике name замеряемого запроса время блока без
+    запросов к базе. Вложенные замеры (сериализатор внутри
+    сериализатора) не считаются повторно.'''
+    metrics = getattr(request, 'metrics', None)
+    if metrics is None or metrics['measuring']:
+        yield
+        return
+    timer = metrics['timer']
+    metrics['measuring'] = True
+    db = timer.duration
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics['measuring'] = False
+        metrics[name] += (
+            time.perf_counter() - started - (timer.duration - db))
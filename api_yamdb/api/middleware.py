@@ -0,0 +1,170 @@
+import random
+import time
+from contextlib import ExitStack
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from rest_framework.permissions import SAFE_METHODS
+
+from . import compression, routers
+from .metrics import QueryTimer, registry
+
+
+class MetricsMiddleware:
+    '''Замеряет выборку запросов к API (доля METRICS_SAMPLE_RATE):
+    число SQL-запросов и время в базе, время сериализации без базы
+    (metrics.measure в сериализаторах и row readers), рендеринга
+    и размер ответа. Итоги копятся в гистограммах /api/v1/metrics/
+    и уходят клиенту в заголовке Server-Timing.'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        timer = QueryTimer()
+        request.metrics = {
+            'render': 0, 'serialize': 0, 'timer': timer, 'measuring': False}
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+        match = request.resolver_match
+        if (match is None or match.namespace != 'api'
+                or match.url_name == 'metrics'):
+            return response
+        values = {
+            'total_ms': total * 1000,
+            'db_ms': timer.duration * 1000,
+            'serialize_ms': request.metrics['serialize'] * 1000,
+            'render_ms': request.metrics['render'] * 1000,
+            'queries': timer.queries,
+        }
+        if not response.streaming:
+            values['size_kb'] = len(response.content) / 1024
+        registry.record(f'{request.method} {match.view_name}', values)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={values["db_ms"]:.1f};desc="{timer.queries} queries"',
+            f'serialize;dur={values["serialize_ms"]:.1f}',
+            f'render;dur={values["render_ms"]:.1f}',
+            f'total;dur={values["total_ms"]:.1f}',
+        ))
+        return response
+
+    def process_template_response(self, request, response):
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                metrics['render'] = time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+class RateLimitHeadersMiddleware:
+    '''Сообщает клиенту остаток квоты, посчитанный throttle-классами.'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit is not None:
+            response['X-RateLimit-Limit'] = rate_limit['limit']
+            response['X-RateLimit-Remaining'] = rate_limit['remaining']
+            response['X-RateLimit-Reset'] = rate_limit['reset']
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    '''Направляет чтение безопасных запросов к представлениям
+    с read_from_replica = True в реплику (DB_REPLICAS). Клиент, который
+    только что что-то записал, DB_REPLICA_STICKY_SECONDS секунд читает
+    из основной базы и видит свою запись несмотря на отставание реплик.
+    Клиент определяется по заголовку Authorization. Анонимные записи
+    (регистрация, получение токена) чтение не закрепляют: за nginx
+    REMOTE_ADDR у всех анонимных клиентов один, а X-Forwarded-For
+    задаёт сам клиент.'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def sticky_key(request):
+        client = request.META.get('HTTP_AUTHORIZATION')
+        if not client:
+            return None
+        return 'db:sticky:' + md5(client.encode()).hexdigest()
+
+    def __call__(self, request):
+        request.read_database = None
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.set_read_database(None)
+        key = self.sticky_key(request)
+        if (settings.DB_REPLICAS and key is not None
+                and request.method not in SAFE_METHODS
+                and response.status_code < 400):
+            cache.set(key, True, settings.DB_REPLICA_STICKY_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'cls', None)
+        key = self.sticky_key(request)
+        if (settings.DB_REPLICAS and request.method in SAFE_METHODS
+                and getattr(view, 'read_from_replica', False)
+                and not (key and cache.get(key))):
+            request.read_database = routers.choose_replica()
+            routers.set_read_database(request.read_database)
+
+
+class CompressionMiddleware:
+    '''Сжимает ответы brotli (если установлен) или gzip по
+    Accept-Encoding. Ответы меньше COMPRESSION_MIN_SIZE байт не сжимаются:
+    выигрыш в размере не окупает время на сжатие и распаковку.'''
+
+    levels = {
+        'br': 'COMPRESSION_BROTLI_QUALITY',
+        'gzip': 'COMPRESSION_GZIP_LEVEL',
+    }
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.streaming or response.has_header('Content-Encoding')
+                or not compression.is_compressible(
+                    response.get('Content-Type', ''))):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        coding = compression.choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+        content = compression.compress(
+            coding, response.content,
+            getattr(settings, self.levels[coding])
+        )
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = coding
+        # сжатое тело отличается побайтно, ETag становится слабым
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -1,4 +1,15 @@
-from rest_framework import mixins, viewsets
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from . import bulk, routers, sparse
+from . import cache as api_cache
+from .metrics import measure
 
 
 class CDLMixinViewSet(
@@ -6,3 +17,151 @@ class CDLMixinViewSet(
     viewsets.GenericViewSet
 ):
     pass
+
+
+class BulkWriteMixin:
+    '''POST на bulk/ создаёт список объектов, PATCH частично изменяет
+    их одной транзакцией. При ошибках ответ 400 со списком ошибок
+    по позициям пакета (пустой словарь у верных объектов).'''
+    bulk_writer_class = None
+
+    @action(detail=False, methods=('post', 'patch'), url_path='bulk')
+    def bulk(self, request):
+        error = bulk.check_items(request.data)
+        if error is not None:
+            return Response(
+                {api_settings.NON_FIELD_ERRORS_KEY: [error]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        writer = self.bulk_writer_class(partial=request.method == 'PATCH')
+        objects = writer.save(request.data)
+        if objects is None:
+            return Response(
+                writer.errors, status=status.HTTP_400_BAD_REQUEST)
+        with measure(request, 'serialize'):
+            data = writer.represent(objects)
+        return Response(
+            data,
+            status=(status.HTTP_200_OK if writer.partial
+                    else status.HTTP_201_CREATED)
+        )
+
+
+class SparseFieldsMixin:
+    '''Не читает из базы столбцы, поля которых убраны из ответа
+    параметрами ?fields= и ?exclude= (см. serializers.SparseFieldsMixin).'''
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        selected = sparse.selected_fields(
+            self.request, sparse.field_names(serializer_class))
+        if selected is None or not queryset.query.can_filter():
+            return queryset
+        deferred = sparse.deferred_columns(serializer_class, selected)
+        return queryset.defer(*deferred) if deferred else queryset
+
+
+class FastReadMixin(SparseFieldsMixin):
+    '''list и retrieve через row_reader_class (api.readers) вместо
+    сериализатора; выключается настройкой FAST_READ_PATH.'''
+    row_reader_class = None
+
+    def use_fast_read(self):
+        return settings.FAST_READ_PATH and self.row_reader_class is not None
+
+    def get_row_reader(self):
+        return self.row_reader_class(sparse.selected_fields(
+            self.request, list(self.row_reader_class.columns)))
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_read():
+            return super().list(request, *args, **kwargs)
+        reader = self.get_row_reader()
+        rows = reader.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        with measure(request, 'serialize'):
+            data = reader.represent(rows if page is None else page)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_fast_read():
+            return super().retrieve(request, *args, **kwargs)
+        reader = self.get_row_reader()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            reader.rows(self.filter_queryset(self.get_queryset())),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, row)
+        with measure(request, 'serialize'):
+            data = reader.represent([row])[0]
+        return Response(data)
+
+
+class VersionedResponseMixin:
+    '''ETag и кэш ответов на GET по версиям данных.
+    Версии пространств имён из get_cache_namespaces() повышаются сигналами
+    при изменении данных, поэтому ETag и ключ кэша меняются вместе с ними.
+    Совпавший If-None-Match отдаёт 304 без запросов к БД и сериализации.
+    Версии повышаются при коммите в основную базу, реплика может ещё
+    не содержать изменений, поэтому кэш заполняется только из основной
+    базы, а ответ, прочитанный из реплики, не получает ETag.'''
+    cache_namespaces = ()
+    cache_responses = False
+    cache_timeout = None
+    cache_anonymous_only = False
+
+    def get_cache_namespaces(self):
+        return self.cache_namespaces
+
+    def is_cacheable(self, request):
+        return self.cache_responses and not (
+            self.cache_anonymous_only and request.user.is_authenticated)
+
+    def not_modified(self, request, etag):
+        # '*' не проверяется: до обработчика неизвестно, есть ли ресурс
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        return etag in etags or f'W/{etag}' in etags
+
+    def versioned_response(self, handler, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return handler(request, *args, **kwargs)
+        digest = api_cache.response_digest(
+            request, self.get_cache_namespaces())
+        etag = f'"{digest}"'
+        if self.not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+        key = api_cache.RESPONSE_KEY.format(digest)
+        cacheable = self.is_cacheable(request)
+        data = cache.get(key) if cacheable else None
+        if data is not None:
+            response = Response(data)
+        else:
+            if cacheable:
+                routers.read_from_primary(request._request)
+            response = handler(request, *args, **kwargs)
+            if cacheable and response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, self.cache_timeout)
+        if (response.status_code == status.HTTP_200_OK
+                and routers.read_database() is None):
+            response['ETag'] = etag
+        return response
+
+
+class VersionedListMixin(VersionedResponseMixin):
+
+    def list(self, request, *args, **kwargs):
+        return self.versioned_response(
+            super().list, request, *args, **kwargs)
+
+
+class VersionedRetrieveMixin(VersionedResponseMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.versioned_response(
+            super().retrieve, request, *args, **kwargs)
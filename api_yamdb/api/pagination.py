@@ -1,5 +1,55 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import (CursorPagination,
+                                       LimitOffsetPagination,
+                                       PageNumberPagination)
 
 
 class PostsPagination(PageNumberPagination):
     page_size = 20
+
+
+class KeysetPagination(CursorPagination):
+    '''Курсорная пагинация: без COUNT(*) и без OFFSET.'''
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class OptionalCursorMixin:
+    '''Переключает пагинатор в курсорный режим по ?pagination=cursor,
+    остальные клиенты получают прежнюю пагинацию. Позиция курсора -
+    первое поле cursor_ordering, строки с одинаковым значением
+    (название, дата) различаются смещением внутри курсора и не
+    пропускаются.'''
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    cursor_ordering = ('pub_date', 'id')
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) != (
+                self.cursor_mode):
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = KeysetPagination()
+        self.cursor_paginator.ordering = self.cursor_ordering
+        page = self.cursor_paginator.paginate_queryset(
+            queryset, request, view)
+        self.display_page_controls = (
+            self.cursor_paginator.display_page_controls)
+        return page
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is None:
+            return super().get_paginated_response(data)
+        return self.cursor_paginator.get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is None:
+            return super().to_html()
+        return self.cursor_paginator.to_html()
+
+
+class TitlePagination(OptionalCursorMixin, LimitOffsetPagination):
+    cursor_ordering = ('-name', '-id')
+
+
+class PubDatePagination(OptionalCursorMixin, PageNumberPagination):
+    cursor_ordering = ('pub_date', 'id')
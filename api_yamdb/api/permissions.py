@@ -26,3 +26,8 @@ class UserRead(permissions.BasePermission):
                 return True
         return request.user.is_authenticated and (
             request.user.is_admin or request.user.is_superuser)
+
+
+class IsAdmin(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.is_admin
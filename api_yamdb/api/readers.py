@@ -0,0 +1,128 @@
+from rest_framework import serializers
+
+from reviews.models import Title
+
+GenreTitle = Title.genre.through
+# то же форматирование даты, что у DateTimeField сериализаторов
+DATETIME = serializers.DateTimeField()
+
+
+class RowReader:
+    '''Быстрое чтение для list/retrieve: строки берутся из values(),
+    вложенные структуры собираются для всей страницы сразу. Результат
+    совпадает с ответом сериализатора, но без создания моделей
+    и полей сериализатора на каждую строку.
+
+    columns - поля ответа в порядке сериализатора и столбцы values(),
+    из которых они собираются; required читаются всегда (по ним идёт
+    курсорная пагинация). names - поля из ?fields=/?exclude=.'''
+    columns = {}
+    required = ('id',)
+
+    def __init__(self, names=None):
+        self.names = names
+
+    def wants(self, name):
+        return self.names is None or name in self.names
+
+    def rows(self, queryset):
+        columns = dict.fromkeys(self.required)
+        for name, sources in self.columns.items():
+            if self.wants(name):
+                columns.update(dict.fromkeys(sources))
+        return queryset.prefetch_related(None).values(*columns)
+
+    def represent(self, rows):
+        items = [self.represent_row(row) for row in rows]
+        if self.names is None:
+            return items
+        return [{name: item[name] for name in self.names} for item in items]
+
+    def represent_row(self, row):
+        raise NotImplementedError
+
+
+class TitleReader(RowReader):
+    '''Как TitleGetSerializer.'''
+    columns = {
+        'id': ('id',),
+        'genre': (),
+        'category': ('category__name', 'category__slug'),
+        'rating': ('rating',),
+        'name': ('name',),
+        'year': ('year',),
+        'description': ('description',),
+    }
+    required = ('id', 'name')
+
+    def represent(self, rows):
+        rows = list(rows)
+        self.genres = {}
+        if not self.wants('genre'):
+            return super().represent(rows)
+        for title_id, name, slug in GenreTitle.objects.filter(
+                title_id__in=[row['id'] for row in rows]
+        ).order_by('genre__name').values_list(
+                'title_id', 'genre__name', 'genre__slug'):
+            self.genres.setdefault(title_id, []).append(
+                {'name': name, 'slug': slug})
+        return super().represent(rows)
+
+    def represent_row(self, row):
+        category = None
+        if row.get('category__slug') is not None:
+            category = {
+                'name': row['category__name'],
+                'slug': row['category__slug'],
+            }
+        return {
+            'id': row['id'],
+            'genre': self.genres.get(row['id'], []),
+            'category': category,
+            'rating': row.get('rating'),
+            'name': row['name'],
+            'year': row.get('year'),
+            'description': row.get('description'),
+        }
+
+
+class ReviewReader(RowReader):
+    '''Как ReviewSerializer.'''
+    columns = {
+        'id': ('id',),
+        'author': ('author__username',),
+        'text': ('text',),
+        'pub_date': ('pub_date',),
+        'score': ('score',),
+    }
+    required = ('id', 'pub_date')
+
+    def represent_row(self, row):
+        return {
+            'id': row['id'],
+            'author': row.get('author__username'),
+            'text': row.get('text'),
+            'pub_date': DATETIME.to_representation(row['pub_date']),
+            'score': row.get('score'),
+        }
+
+
+class CommentReader(RowReader):
+    '''Как CommentSerializer.'''
+    columns = {
+        'id': ('id',),
+        'review': ('review__text',),
+        'author': ('author__username',),
+        'text': ('text',),
+        'pub_date': ('pub_date',),
+    }
+    required = ('id', 'pub_date')
+
+    def represent_row(self, row):
+        return {
+            'id': row['id'],
+            'review': row.get('review__text'),
+            'author': row.get('author__username'),
+            'text': row.get('text'),
+            'pub_date': DATETIME.to_representation(row['pub_date']),
+        }
@@ -0,0 +1,29 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    # без orjson ответы рендерит json из стандартной библиотеки
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    '''JSONRenderer на orjson, если он установлен. Ответ тот же, что
+    у JSONRenderer: компактный UTF-8, даты, ленивые строки и прочие
+    типы кодируются encoder_class DRF. Отступы (Accept: ...; indent=)
+    по-прежнему делает json.'''
+    options = orjson and (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(
+                accepted_media_type, renderer_context or {}):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        ret = orjson.dumps(
+            data, default=self.encoder_class().default, option=self.options)
+        # как JSONRenderer: U+2028 и U+2029 недопустимы в JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,69 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+_state = threading.local()
+# реплика -> момент (time.monotonic), до которого она считается недоступной
+_down_until = {}
+
+
+def read_database():
+    '''База для чтения в текущем потоке, None - основная.'''
+    return getattr(_state, 'database', None)
+
+
+def set_read_database(alias):
+    _state.database = alias
+
+
+def read_from_primary(request):
+    '''Переключает оставшееся чтение запроса на основную базу.'''
+    request.read_database = None
+    set_read_database(None)
+
+
+def is_available(alias):
+    '''Проверяет соединение с репликой; упавшая реплика не опрашивается
+    DB_REPLICA_RETRY_DELAY секунд, чтобы не ждать таймаута на каждом
+    запросе.'''
+    if _down_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        _down_until[alias] = (
+            time.monotonic() + settings.DB_REPLICA_RETRY_DELAY)
+        return False
+    return True
+
+
+def choose_replica():
+    '''Случайная доступная реплика или None, если доступных нет.'''
+    replicas = list(settings.DB_REPLICAS)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if is_available(alias):
+            return alias
+    return None
+
+
+class ReplicaRouter:
+    '''Чтение идёт в реплику, выбранную для запроса
+    ReplicaRoutingMiddleware, запись и всё остальное - в основную базу.'''
+
+    def db_for_read(self, model, **hints):
+        return read_database()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # реплики получают схему через репликацию
+        return db == 'default'
@@ -0,0 +1,93 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db import connections
+from django.db.models import Case, FloatField, Value, When
+
+from reviews.models import Title
+from .cache import get_versions
+
+TOKEN_RE = re.compile(r'\w+')
+# Слово в названии весит больше, чем в описании, как веса A и B
+# в поисковом векторе PostgreSQL
+NAME_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+MAX_RESULTS = 1000
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class InvertedIndex:
+    '''Инвертированный индекс произведений в памяти процесса для баз
+    без полнотекстового поиска (SQLite в тестах). Ищет, как и запрос
+    к PostgreSQL, по префиксам всех слов запроса.'''
+
+    def __init__(self, rows):
+        self.postings = defaultdict(lambda: defaultdict(int))
+        for title_id, name, description in rows:
+            for token in tokenize(name):
+                self.postings[token][title_id] += NAME_WEIGHT
+            for token in tokenize(description):
+                self.postings[token][title_id] += DESCRIPTION_WEIGHT
+        self.tokens = sorted(self.postings)
+
+    def prefix_matches(self, prefix):
+        matches = defaultdict(int)
+        position = bisect_left(self.tokens, prefix)
+        while (position < len(self.tokens)
+               and self.tokens[position].startswith(prefix)):
+            for title_id, weight in self.postings[
+                    self.tokens[position]].items():
+                matches[title_id] += weight
+            position += 1
+        return matches
+
+    def search(self, tokens):
+        '''Словарь id произведения -> релевантность.'''
+        scores = None
+        for token in tokens:
+            matches = self.prefix_matches(token)
+            if scores is None:
+                scores = matches
+                continue
+            scores = {
+                title_id: score + matches[title_id]
+                for title_id, score in scores.items() if title_id in matches
+            }
+        return scores or {}
+
+
+_index = {}
+
+
+def get_index():
+    '''Индекс перестраивается при записи произведений. Отзывы меняют
+    только рейтинг и версию 'titles', но не поисковую.'''
+    version = get_versions(['search'])[0]
+    if _index.get('version') != version:
+        _index['index'] = InvertedIndex(
+            Title.objects.values_list('id', 'name', 'description').iterator())
+        _index['version'] = version
+    return _index['index']
+
+
+def search_titles(queryset, text):
+    '''Поиск по названию и описанию с сортировкой по релевантности.'''
+    tokens = tokenize(text)
+    if not tokens:
+        return queryset.none()
+    if connections[queryset.db].vendor == 'postgresql':
+        return queryset.search(tokens, text)
+    scores = get_index().search(tokens)
+    best = sorted(scores, key=lambda pk: (-scores[pk], pk))[:MAX_RESULTS]
+    if not best:
+        return queryset.none()
+    rank = Case(
+        *[When(pk=pk, then=Value(scores[pk])) for pk in best],
+        output_field=FloatField()
+    )
+    return queryset.filter(pk__in=best).annotate(rank=rank).order_by(
+        '-rank', '-name')
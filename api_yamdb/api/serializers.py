@@ -1,11 +1,35 @@
-from django.shortcuts import get_object_or_404
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
 
-from reviews.models import Comment, Review, Title, User, Category, Genre
+from reviews.models import (Comment, Review, Title, TitleRanking, User,
+                            Category, Genre)
+from .metrics import measure
+from .sparse import selected_fields
 
 
-class UsersSerializer(serializers.ModelSerializer):
+class MeasuredMixin:
+    '''Время сериализации ответа для MetricsMiddleware.'''
+
+    def to_representation(self, instance):
+        with measure(self.context.get('request'), 'serialize'):
+            return super().to_representation(instance)
+
+
+class SparseFieldsMixin:
+    '''Убирает поля, не запрошенные в ?fields= или указанные
+    в ?exclude=, у сериализатора ответа. Вложенные сериализаторы
+    создаются без контекста запроса и остаются полными.'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = selected_fields(
+            self.context.get('request'), list(self.fields))
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+
+class UsersSerializer(MeasuredMixin, SparseFieldsMixin,
+                      serializers.ModelSerializer):
     class Meta:
         model = User
         fields = (
@@ -24,8 +48,10 @@ class UsersSerializer(serializers.ModelSerializer):
         return value
 
 
-class AuthSerializer(serializers.ModelSerializer):
-    email = serializers.EmailField()
+class AuthSerializer(MeasuredMixin, serializers.ModelSerializer):
+    # без UniqueValidator: занятость проверяет INSERT в sign_up
+    username = serializers.CharField(max_length=20)
+    email = serializers.EmailField(max_length=30)
 
     class Meta:
         model = User
@@ -52,14 +78,12 @@ class GetTitle:
     requires_context = True
 
     def __call__(self, serializer_field):
-        c_view = serializer_field.context['view']
-        title_id = c_view.kwargs.get('title_id')
-        return get_object_or_404(Title, id=title_id)
+        return serializer_field.context['view'].get_title()
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(MeasuredMixin, SparseFieldsMixin,
+                       serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
-        default=serializers.CurrentUserDefault(),
         slug_field='username',
         read_only=True
     )
@@ -68,15 +92,10 @@ class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ('id', 'author', 'text', 'pub_date', 'score', 'title')
-        validators = (
-            UniqueTogetherValidator(
-                queryset=Review.objects.all(),
-                fields=('title', 'author',)
-            ),
-        )
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(MeasuredMixin, SparseFieldsMixin,
+                        serializers.ModelSerializer):
     review = serializers.SlugRelatedField(
         read_only=True,
         slug_field='text'
@@ -91,31 +110,34 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(MeasuredMixin, SparseFieldsMixin,
+                         serializers.ModelSerializer):
 
     class Meta:
         exclude = ('id',)
         model = Category
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(MeasuredMixin, SparseFieldsMixin,
+                      serializers.ModelSerializer):
 
     class Meta:
         exclude = ('id',)
         model = Genre
 
 
-class TitleGetSerializer(serializers.ModelSerializer):
+class TitleGetSerializer(MeasuredMixin, SparseFieldsMixin,
+                         serializers.ModelSerializer):
     genre = GenreSerializer(read_only=True, many=True)
     category = CategorySerializer(read_only=True)
     rating = serializers.IntegerField()
 
     class Meta:
-        fields = '__all__'
+        exclude = ('score_sum', 'reviews_count', 'search_vector')
         model = Title
 
 
-class TitlePostSerializer(serializers.ModelSerializer):
+class TitlePostSerializer(MeasuredMixin, serializers.ModelSerializer):
     genre = serializers.SlugRelatedField(
         queryset=Genre.objects.all(),
         slug_field='slug',
@@ -127,6 +149,45 @@ class TitlePostSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = '__all__'
+        exclude = ('rating', 'score_sum', 'reviews_count', 'search_vector')
         read_only_fields = ('id',)
         model = Title
+
+
+class CategoryBulkSerializer(CategorySerializer):
+    '''Категория из пакета: уникальность slug проверяется
+    для всего пакета одним запросом (api.bulk).'''
+
+    class Meta(CategorySerializer.Meta):
+        extra_kwargs = {'slug': {'validators': []}}
+
+
+class GenreBulkSerializer(GenreSerializer):
+
+    class Meta(GenreSerializer.Meta):
+        extra_kwargs = {'slug': {'validators': []}}
+
+
+class TitleBulkSerializer(TitlePostSerializer):
+    '''Произведение из пакета: slug жанров и категорий не ищутся
+    в базе по одному, их разрешает api.bulk для всего пакета.'''
+    id = serializers.IntegerField(required=False)
+    genre = serializers.ListField(child=serializers.SlugField())
+    category = serializers.SlugField()
+
+
+class RankedTitleSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        fields = ('id', 'name', 'year', 'rating')
+        model = Title
+
+
+class TitleRankingSerializer(MeasuredMixin, SparseFieldsMixin,
+                             serializers.ModelSerializer):
+    position = serializers.IntegerField()
+    title = RankedTitleSerializer(read_only=True)
+
+    class Meta:
+        fields = ('position', 'score', 'title')
+        model = TitleRanking
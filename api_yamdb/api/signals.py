@@ -0,0 +1,98 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleRanking, User)
+from reviews.signals import bulk_changed
+from .authentication import (CLAIM_FIELDS, forget_token_version,
+                             revoke_tokens)
+from .cache import bump_versions_on_commit
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, **kwargs):
+    bump_versions_on_commit('categories', 'titles')
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def genre_changed(sender, **kwargs):
+    bump_versions_on_commit('genres', 'titles')
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def title_changed(sender, **kwargs):
+    # 'search' - версия поискового индекса, её не меняют отзывы
+    bump_versions_on_commit('titles', 'search')
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_versions_on_commit('titles')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    # рейтинг произведения входит в ответы /titles/,
+    # текст отзыва - в ответы с комментариями к нему
+    bump_versions_on_commit(
+        'titles',
+        f'reviews:{instance.title_id}',
+        f'comments:{instance.pk}'
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    bump_versions_on_commit(f'comments:{instance.review_id}')
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, created, **kwargs):
+    # username автора выводится в отзывах и комментариях,
+    # у нового пользователя их ещё нет
+    if not created:
+        bump_versions_on_commit('users')
+
+
+@receiver(pre_save, sender=User)
+def user_claims_changed(sender, instance, raw=False, **kwargs):
+    # роль и флаги зашиты в выданные токены, при их изменении
+    # старые токены отзываются
+    if raw or instance.pk is None:
+        return
+    old = User.objects.filter(pk=instance.pk).values(*CLAIM_FIELDS).first()
+    if old and any(
+            old[field] != getattr(instance, field) for field in CLAIM_FIELDS):
+        # новая версия и в экземпляре, иначе save() запишет прежнюю
+        instance.token_version = revoke_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    forget_token_version(instance.pk)
+
+
+# Массовые операции не знают, какие отзывы и комментарии затронуты,
+# поэтому повышают общие версии, которые входят в ключи всех ответов.
+BULK_NAMESPACES = {
+    User: ('users',),
+    Category: ('categories', 'titles'),
+    Genre: ('genres', 'titles'),
+    Title: ('titles', 'search'),
+    Title.genre.through: ('titles',),
+    Review: ('titles', 'reviews', 'comments'),
+    Comment: ('comments',),
+    TitleRanking: ('leaderboards',),
+}
+
+
+@receiver(bulk_changed)
+def bulk_data_changed(sender, **kwargs):
+    bump_versions_on_commit(*BULK_NAMESPACES.get(sender, ()))
@@ -0,0 +1,47 @@
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+# поля сериализаторов по классам, чтобы не строить их ради имён
+_field_names = {}
+
+
+def parse(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def selected_fields(request, names):
+    '''Поля ответа с учётом ?fields= и ?exclude= в порядке names,
+    None - нужны все. Действует только на чтение: запись проверяет
+    и возвращает объект целиком. Неизвестные имена игнорируются;
+    если не остаётся ни одного поля, отдаются все.'''
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    only = parse(params.get(FIELDS_PARAM, '')) & set(names)
+    exclude = parse(params.get(EXCLUDE_PARAM, ''))
+    selected = [
+        name for name in names
+        if (not only or name in only) and name not in exclude
+    ]
+    if not selected or len(selected) == len(names):
+        return None
+    return selected
+
+
+def field_names(serializer_class):
+    if serializer_class not in _field_names:
+        _field_names[serializer_class] = list(serializer_class().fields)
+    return _field_names[serializer_class]
+
+
+def deferred_columns(serializer_class, selected):
+    '''Столбцы модели, нужные только отброшенным полям сериализатора.
+    Связи не откладываются: их загружает select_related.'''
+    dropped = set(field_names(serializer_class)) - set(selected)
+    return [
+        field.name
+        for field in serializer_class.Meta.model._meta.concrete_fields
+        if field.name in dropped
+        and not field.is_relation and not field.primary_key
+    ]
@@ -0,0 +1,43 @@
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import StaticFilesStorage
+
+from . import compression
+
+# Статика сжимается один раз при collectstatic, поэтому максимально
+STATIC_LEVELS = {
+    'br': 11,
+    'gzip': 9,
+}
+
+
+class CompressedStaticFilesStorage(StaticFilesStorage):
+    '''После collectstatic кладёт рядом с текстовыми файлами STATIC_ROOT
+    сжатые копии file.gz и file.br, которые nginx отдаёт сам
+    (gzip_static). Сжимаются и файлы, лежащие в STATIC_ROOT напрямую,
+    как redoc.yaml. Копия не создаётся, если она не меньше оригинала.'''
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        for root, _, files in os.walk(self.location):
+            for name in files:
+                if name.endswith(compression.COMPRESSIBLE_EXTENSIONS):
+                    self.compress_file(os.path.join(root, name))
+        for path in paths:
+            yield path, path, False
+
+    def compress_file(self, path):
+        with open(path, 'rb') as source:
+            content = source.read()
+        if len(content) < settings.COMPRESSION_MIN_SIZE:
+            return
+        for coding, level in STATIC_LEVELS.items():
+            if coding not in compression.encoders():
+                continue
+            compressed = compression.compress(coding, content, level)
+            extension = '.gz' if coding == 'gzip' else '.br'
+            if len(compressed) < len(content):
+                with open(path + extension, 'wb') as out:
+                    out.write(compressed)
@@ -1,4 +1,8 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
 from rest_framework import throttling
+from rest_framework.settings import api_settings
 
 import datetime
 
@@ -6,7 +10,83 @@ import datetime
 class WorkingHoursRateThrottle(throttling.BaseThrottle):
 
     def allow_request(self, request, view):
-        now = datetime.datetime.now().hour
+        now = datetime.datetime.now(timezone.get_current_timezone()).hour
         if now >= 5 and now <= 6:
             return False
         return True
+
+
+class SlidingWindowThrottle(throttling.SimpleRateThrottle):
+    '''Скользящее окно из двух счётчиков вместо списка меток времени.
+
+    Запросы считаются атомарным incr в общем кэше (THROTTLE_CACHE),
+    поэтому лимит един для всех процессов, а проверка стоит два
+    обращения к кэшу независимо от числа запросов. Число запросов
+    за последние duration секунд оценивается как счётчик текущего
+    окна плюс доля счётчика предыдущего.'''
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE]
+
+    @property
+    def THROTTLE_RATES(self):
+        # читаются при каждой проверке, а не при импорте,
+        # чтобы действовал override_settings (бенчмарк, тесты)
+        return api_settings.DEFAULT_THROTTLE_RATES
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        now = self.timer()
+        window = int(now // self.duration)
+        self.elapsed = now - window * self.duration
+        current_key = f'{self.key}:{window}'
+        previous = self.cache.get(f'{self.key}:{window - 1}', 0)
+        used = (
+            previous * (1 - self.elapsed / self.duration)
+            + self.increment(current_key)
+        )
+        allowed = used <= self.num_requests
+        if not allowed:
+            # отклонённый запрос не расходует квоту
+            self.cache.decr(current_key)
+            used -= 1
+        self.remember_limit(request, max(0, int(self.num_requests - used)))
+        return allowed
+
+    def increment(self, key):
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # окно только началось; предыдущее окно нужно ещё
+            # duration секунд, отсюда двойной срок хранения
+            if self.cache.add(key, 1, 2 * self.duration):
+                return 1
+            return self.cache.incr(key)
+
+    def remember_limit(self, request, remaining):
+        '''Для заголовков X-RateLimit-* сохраняет самый строгий лимит.'''
+        current = getattr(request._request, 'rate_limit', None)
+        if current is not None and current['remaining'] <= remaining:
+            return
+        request._request.rate_limit = {
+            'limit': self.num_requests,
+            'remaining': remaining,
+            'reset': int(self.duration - self.elapsed) + 1,
+        }
+
+    def wait(self):
+        return self.duration - self.elapsed
+
+
+class UserRateThrottle(throttling.UserRateThrottle, SlidingWindowThrottle):
+    pass
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle,
+                         SlidingWindowThrottle):
+    pass
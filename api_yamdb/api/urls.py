@@ -3,6 +3,9 @@ from rest_framework.routers import DefaultRouter
 from .views import (AuthViewSet,
                     CategoryViewSet,
                     CommentViewSet,
+                    ExportView,
+                    LeaderboardViewSet,
+                    MetricsView,
                     UserViewSet,
                     TitleViewSet,
                     GenreViewSet,
@@ -24,10 +27,14 @@ router_v1.register(
     r'^titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)/comments',
     CommentViewSet,
     basename='comments')
+router_v1.register(
+    'leaderboards', LeaderboardViewSet, basename='leaderboards')
 
 
 urlpatterns = [
     path('v1/auth/signup/', AuthViewSet.sign_up),
     path('v1/auth/token/', AuthViewSet.jwt_token),
+    path('v1/export/<str:kind>/', ExportView.as_view()),
+    path('v1/metrics/', MetricsView.as_view(), name='metrics'),
     path('v1/', include(router_v1.urls)),
 ]
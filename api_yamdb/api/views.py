@@ -1,31 +1,44 @@
-from api_yamdb.settings import EMAIL_FROM
+from api_yamdb.settings import (API_CACHE_TIMEOUTS, EMAIL_FROM,
+                                LEADERBOARD_SIZE)
 
-from django.core.mail import send_mail
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework import viewsets, permissions, status, filters
+from rest_framework import mixins, viewsets, permissions, status, filters
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueTogetherValidator
+from rest_framework.views import APIView
 from django.contrib.auth.tokens import default_token_generator
-from rest_framework_simplejwt.tokens import AccessToken
 
 
-from reviews.models import User, Category, Genre, Title, Review
+from reviews.models import (User, Category, Genre, MailMessage, Title,
+                            TitleRanking, Review)
+from . import bulk, export, readers
+from .authentication import RoleAccessToken
 from .filters import TitleFilter
-from .mixins import CDLMixinViewSet
-from .permissions import (AdminModeratorAuthorPermission,
+from .metrics import connection_stats, registry
+from .mixins import (BulkWriteMixin, CDLMixinViewSet, FastReadMixin,
+                     SparseFieldsMixin, VersionedListMixin,
+                     VersionedRetrieveMixin)
+from .pagination import PubDatePagination, TitlePagination
+from .permissions import (AdminModeratorAuthorPermission, IsAdmin,
                           IsAdminSuperOrReadOnly, UserRead)
 from .serializers import (AuthSerializer, AuthTokenSerializer,
                           CategorySerializer, CommentSerializer,
                           GenreSerializer, TitlePostSerializer,
-                          TitleGetSerializer, ReviewSerializer,
-                          UsersSerializer)
+                          TitleGetSerializer, TitleRankingSerializer,
+                          ReviewSerializer, UsersSerializer)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     '''Реализация операций с моделью пользователей:
     - получение списка пользователей
     - добавление пользователя
@@ -80,28 +93,22 @@ class AuthViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         email = serializer.validated_data.get('email')
         username = serializer.validated_data.get('username')
-        exist_mail = User.objects.filter(email=email).exists()
-        exist_user = User.objects.filter(username=username).exists()
-        if exist_user or exist_mail:
+        # уникальность username и email проверяют ограничения БД:
+        # один INSERT вместо проверок exists() и без гонки между ними
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username=username, email=email)
+                confirmation_code = default_token_generator.make_token(user)
+                # письмо отправит воркер send_mail_queue
+                MailMessage.objects.create(
+                    subject='Токен',
+                    body=f'Токен: {confirmation_code}',
+                    from_email=EMAIL_FROM,
+                    recipient=email,
+                )
+        except IntegrityError:
             return Response('Имя пользователя или данные уже заняты',
                             status=status.HTTP_400_BAD_REQUEST)
-            # без статуса 400, тесты не проходит
-        try:
-            user = User.objects.get_or_create(
-                username=username,
-                email=email
-            )[0]
-        except NameError:
-            Response('Имя пользователя или данные уже заняты',
-                     status=status.HTTP_400_BAD_REQUEST)
-        confirmation_code = default_token_generator.make_token(user)
-        send_mail(
-            subject='Токен',
-            message=f'Токен: {confirmation_code}',
-            from_email=EMAIL_FROM,
-            recipient_list=[email],
-            fail_silently=False,
-        )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @api_view(['POST'])
@@ -114,14 +121,14 @@ class AuthViewSet(viewsets.ModelViewSet):
         confirmation_code = serializer.validated_data.get('confirmation_code')
         error = {'ошибка': 'код некорректный'}
         if default_token_generator.check_token(user, confirmation_code):
-            token = AccessToken.for_user(user)
+            token = RoleAccessToken.for_user(user)
             return Response({'token': str(token)},
                             status=status.HTTP_200_OK)
         else:
             return Response(error, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CategoryViewSet(CDLMixinViewSet):
+class CategoryViewSet(BulkWriteMixin, VersionedListMixin, CDLMixinViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = (IsAdminSuperOrReadOnly,)
@@ -129,9 +136,14 @@ class CategoryViewSet(CDLMixinViewSet):
     filter_backends = (DjangoFilterBackend, filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
+    cache_namespaces = ('categories',)
+    cache_responses = True
+    cache_timeout = API_CACHE_TIMEOUTS['categories']
+    bulk_writer_class = bulk.CategoryWriter
+    read_from_replica = True
 
 
-class GenreViewSet(CDLMixinViewSet):
+class GenreViewSet(BulkWriteMixin, VersionedListMixin, CDLMixinViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (IsAdminSuperOrReadOnly,)
@@ -139,16 +151,30 @@ class GenreViewSet(CDLMixinViewSet):
     filter_backends = (DjangoFilterBackend, filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
+    cache_namespaces = ('genres',)
+    cache_responses = True
+    cache_timeout = API_CACHE_TIMEOUTS['genres']
+    bulk_writer_class = bulk.GenreWriter
+    read_from_replica = True
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')).all().order_by('-name')
+class TitleViewSet(BulkWriteMixin, VersionedListMixin,
+                   VersionedRetrieveMixin, FastReadMixin,
+                   viewsets.ModelViewSet):
+    queryset = Title.objects.select_related('category').prefetch_related(
+        'genre').defer('search_vector').order_by('-name')
     serializer_class = TitleGetSerializer
     permission_classes = (IsAdminSuperOrReadOnly,)
-    pagination_class = LimitOffsetPagination
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter,)
+    pagination_class = TitlePagination
+    filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
+    cache_namespaces = ('titles',)
+    cache_responses = True
+    cache_timeout = API_CACHE_TIMEOUTS['titles']
+    cache_anonymous_only = True
+    read_from_replica = True
+    bulk_writer_class = bulk.TitleWriter
+    row_reader_class = readers.TitleReader
 
     def get_serializer_class(self):
         if self.action in ('create', 'update', 'partial_update'):
@@ -156,29 +182,154 @@ class TitleViewSet(viewsets.ModelViewSet):
         return TitleGetSerializer
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(VersionedListMixin, VersionedRetrieveMixin,
+                     FastReadMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = (AdminModeratorAuthorPermission,)
+    pagination_class = PubDatePagination
+    read_from_replica = True
+    row_reader_class = readers.CommentReader
+
+    def get_cache_namespaces(self):
+        return (
+            'users', 'comments', f'comments:{self.kwargs.get("review_id")}')
 
     def get_review(self):
-        return get_object_or_404(Review, id=self.kwargs.get('review_id'))
+        '''Отзыв из URL, принадлежащий произведению из URL; загружается
+        одним запросом и переиспользуется до конца обработки.'''
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review,
+                id=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id')
+            )
+        return self._review
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return self.get_review().comments.select_related('author', 'review')
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user, review=self.get_review())
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(VersionedListMixin, VersionedRetrieveMixin,
+                    FastReadMixin, viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = (AdminModeratorAuthorPermission,)
+    pagination_class = PubDatePagination
+    read_from_replica = True
+    row_reader_class = readers.ReviewReader
+
+    def get_cache_namespaces(self):
+        return (
+            'users', 'reviews', f'reviews:{self.kwargs.get("title_id")}')
 
     def get_title(self):
-        return get_object_or_404(Title, id=self.kwargs.get('title_id'))
+        '''Произведение из URL, загружается один раз за запрос.'''
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title.objects.only('id'), id=self.kwargs.get('title_id'))
+        return self._title
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return self.get_title().reviews.select_related('author')
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title())
+        # уникальность отзыва проверяет ограничение unique_review,
+        # а не отдельный запрос валидатора
+        try:
+            with transaction.atomic():
+                review = serializer.save(
+                    author=self.request.user, title=self.get_title())
+                Title.objects.filter(pk=review.title_id).change_rating(
+                    score=review.score, count=1)
+        except IntegrityError:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    UniqueTogetherValidator.message.format(
+                        field_names='title, author')
+                ]
+            }, code='unique')
+
+    def perform_update(self, serializer):
+        old_score = serializer.instance.score
+        with transaction.atomic():
+            review = serializer.save()
+            Title.objects.filter(pk=review.title_id).change_rating(
+                score=review.score - old_score)
+
+    def perform_destroy(self, instance):
+        # рейтинг произведения уменьшает обработчик post_delete
+        with transaction.atomic():
+            instance.delete()
+
+
+class LeaderboardViewSet(VersionedListMixin, mixins.ListModelMixin,
+                         viewsets.GenericViewSet):
+    '''Топ произведений из материализованной таблицы рейтингов:
+    ?kind=rating|reviews|weighted, ?genre= или ?category=, ?limit=.'''
+    serializer_class = TitleRankingSerializer
+    permission_classes = (permissions.AllowAny,)
+    pagination_class = None
+    cache_namespaces = ('titles', 'leaderboards')
+    cache_responses = True
+    cache_timeout = API_CACHE_TIMEOUTS['titles']
+
+    def get_queryset(self):
+        params = self.request.query_params
+        kind = params.get('kind', TitleRanking.RATING)
+        if kind not in dict(TitleRanking.KINDS):
+            raise ValidationError({'kind': f'Неизвестный рейтинг {kind}'})
+        scope = 'all'
+        for field in ('genre', 'category'):
+            if params.get(field):
+                scope = f'{field}:{params[field]}'
+        limit = params.get('limit', '10')
+        if not limit.isdigit():
+            raise ValidationError({'limit': 'Ожидается целое число'})
+        order = (F('score').desc(), F('title_id').asc())
+        return TitleRanking.objects.filter(kind=kind, scope=scope).annotate(
+            position=Window(RowNumber(), order_by=order)
+        ).select_related('title').defer('title__search_vector').order_by(
+            *order)[:min(int(limit), LEADERBOARD_SIZE)]
+
+
+class ExportView(APIView):
+    '''Потоковая выгрузка произведений, отзывов и комментариев
+    в NDJSON или CSV (?output=csv) с фильтрами списка произведений.'''
+    permission_classes = (IsAdmin,)
+    content_types = {
+        'ndjson': 'application/x-ndjson; charset=utf-8',
+        'csv': 'text/csv; charset=utf-8',
+    }
+
+    def get(self, request, kind):
+        output = request.query_params.get('output', 'ndjson')
+        if kind not in export.FIELDS or output not in self.content_types:
+            raise NotFound()
+        filterset = export.title_filter(request.query_params)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        response = StreamingHttpResponse(
+            export.export(kind, output, filterset.qs),
+            content_type=self.content_types[output]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{kind}.{output}"')
+        return response
+
+
+class MetricsView(APIView):
+    '''Гистограммы метрик запросов этого процесса; DELETE обнуляет их.'''
+    permission_classes = (IsAdmin,)
+
+    def get(self, request):
+        return Response({
+            'endpoints': registry.snapshot(),
+            'connections': connection_stats.snapshot(),
+        })
+
+    def delete(self, request):
+        registry.reset()
+        connection_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,123 @@
+"""
+ASGI config for YaMDb project.
+
+It exposes the ASGI callable as a module-level variable named ``application``
+for uvicorn (``gunicorn -k uvicorn.workers.UvicornWorker``).
+
+Django 2.2 has no ASGI handler and no async views, so the WSGI application
+is wrapped with asgiref. Its WsgiToAsgi runs every request in one shared
+thread; here each request gets a thread from a pool of ASGI_THREADS, so
+requests waiting on the database or memcached do not block each other.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from asgiref.sync import AsyncToSync, sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('ASGI_THREADS', 8)),
+    thread_name_prefix='asgi'
+)
+
+
+class ThreadPoolWsgiToAsgiInstance(WsgiToAsgiInstance):
+    '''Запрос к WSGI-приложению в потоке из пула. В отличие от asgiref
+    вызывает close() ответа WSGI: без него Django не отправляет
+    request_finished, и соединения с БД не закрываются и не проверяются
+    в конце запроса. Из asgiref берётся только build_environ.'''
+
+    def __init__(self, wsgi_application):
+        super().__init__(wsgi_application)
+        self.response_started = False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError('WSGI wrapper received a non-HTTP scope')
+        self.scope = scope
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                if message['type'] != 'http.request':
+                    raise ValueError(
+                        'WSGI wrapper received a non-HTTP-request message')
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            self.sync_send = AsyncToSync(send)
+            await self.run_wsgi_app(body)
+
+    def start_response(self, status, response_headers, exc_info=None):
+        if exc_info is not None and self.response_started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.response_start = {
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [
+                (name.lower().encode('ascii'), value.encode('latin1'))
+                for name, value in response_headers
+            ],
+        }
+        self.response_content_length = next((
+            int(value) for name, value in response_headers
+            if name.lower() == 'content-length'
+        ), None)
+
+    def send_start(self):
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+
+    def send_body(self, response):
+        '''Отправляет тело, не больше Content-Length байт.'''
+        remaining = self.response_content_length
+        for chunk in response:
+            self.send_start()
+            if remaining is not None:
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+            self.sync_send({
+                'type': 'http.response.body', 'body': chunk,
+                'more_body': True})
+            if remaining == 0:
+                break
+        self.send_start()
+        self.sync_send({'type': 'http.response.body'})
+
+    def run_wsgi(self, body):
+        environ = self.build_environ(self.scope, body)
+        response = self.wsgi_application(environ, self.start_response)
+        try:
+            self.send_body(response)
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+
+    run_wsgi_app = sync_to_async(
+        run_wsgi,
+        thread_sensitive=False,
+        executor=executor
+    )
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            # событий запуска и остановки у проекта нет
+            while True:
+                message = await receive()
+                await send({'type': message['type'] + '.complete'})
+                if message['type'] == 'lifespan.shutdown':
+                    return
+        await ThreadPoolWsgiToAsgiInstance(self.wsgi_application)(
+            scope, receive, send)
+
+
+application = ThreadPoolWsgiToAsgi(get_wsgi_application())
@@ -21,15 +21,18 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     # 'djoser',
     'rest_framework_simplejwt',
     'django_filters',
-    'api',
+    'api.apps.ApiConfig',
     'reviews.apps.ReviewsConfig',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -37,6 +40,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.RateLimitHeadersMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
@@ -66,6 +71,13 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 EMAIL_FROM = 'admin@api_yamdb.ru'
 
+# Очередь писем: сколько отправлять за одно соединение,
+# сколько раз повторять и базовая задержка повтора в секундах
+MAIL_QUEUE_BATCH_SIZE = int(os.getenv('MAIL_QUEUE_BATCH_SIZE', 50))
+MAIL_QUEUE_MAX_ATTEMPTS = int(os.getenv('MAIL_QUEUE_MAX_ATTEMPTS', 5))
+MAIL_QUEUE_RETRY_DELAY = int(os.getenv('MAIL_QUEUE_RETRY_DELAY', 30))
+MAIL_QUEUE_POLL_INTERVAL = int(os.getenv('MAIL_QUEUE_POLL_INTERVAL', 2))
+
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
@@ -73,9 +85,91 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', 'db'),
-        'PORT': os.getenv('DB_PORT', '5432')
+        'PORT': os.getenv('DB_PORT', '5432'),
+        # постоянные соединения: одно на поток воркера, живёт до
+        # DB_CONN_MAX_AGE секунд (0 - новое соединение на каждый запрос)
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # pgbouncer в режиме transaction не сохраняет серверные курсоры
+        # между транзакциями, iterator() читает данные без них
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_PGBOUNCER', 'False') == 'True'),
+    }
+}
+
+# Реплики для чтения: DB_REPLICA_HOSTS=host1,host2:5433. Остальные
+# параметры подключения те же, что у основной базы
+DB_REPLICAS = []
+for number, address in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+    host, _, port = address.strip().partition(':')
+    alias = f'replica{number}'
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        HOST=host,
+        PORT=port or DATABASES['default']['PORT'],
+        # в тестах реплика - та же тестовая база
+        TEST={'MIRROR': 'default'},
+    )
+    DB_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+# Сколько секунд клиент читает из основной базы после своей записи
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+# Через сколько секунд снова пробовать недоступную реплику
+DB_REPLICA_RETRY_DELAY = int(os.getenv('DB_REPLICA_RETRY_DELAY', 30))
+
+# Проверка постоянного соединения (SELECT 1) перед запросом, если оно
+# простаивало дольше DB_CONN_HEALTH_CHECK_DELAY секунд
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+DB_CONN_HEALTH_CHECK_DELAY = int(os.getenv('DB_CONN_HEALTH_CHECK_DELAY', 30))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'yamdb'),
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', 300)),
     }
 }
+if CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 1000)),
+    }
+
+# Время жизни закэшированных ответов API по эндпоинтам, в секундах
+API_CACHE_TIMEOUTS = {
+    'categories': int(os.getenv('CACHE_TIMEOUT_CATEGORIES', 600)),
+    'genres': int(os.getenv('CACHE_TIMEOUT_GENRES', 600)),
+    'titles': int(os.getenv('CACHE_TIMEOUT_TITLES', 60)),
+}
+
+# Поиск произведений: конфигурация to_tsvector и нечёткий поиск
+# по названию через pg_trgm (расширение создаётся после migrate)
+TITLE_SEARCH_CONFIG = os.getenv('TITLE_SEARCH_CONFIG', 'simple')
+TITLE_SEARCH_TRIGRAM = os.getenv('TITLE_SEARCH_TRIGRAM', 'True') == 'True'
+
+# Счётчики ограничения частоты запросов; кэш должен быть общим
+# для всех процессов (memcached), иначе лимит считается в каждом отдельно
+THROTTLE_CACHE = os.getenv('THROTTLE_CACHE', 'default')
+
+# Сжатие ответов: минимальный размер в байтах и степень сжатия.
+# Ответы сжимаются на лету, поэтому уровни умеренные
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+
+# Доля запросов к API, для которых собираются метрики (0 - выключено)
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 0.01))
+
+# Списки и объекты произведений, отзывов и комментариев собираются
+# из values() без ModelSerializer (api.readers), ответ тот же
+FAST_READ_PATH = os.getenv('FAST_READ_PATH', 'True') == 'True'
+
+# Сколько объектов можно создать или изменить одним запросом на bulk/
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 5000))
+
+# Топы произведений: размер и минимум отзывов для байесовской оценки
+LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', 100))
+LEADERBOARD_MIN_VOTES = int(os.getenv('LEADERBOARD_MIN_VOTES', 5))
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -103,6 +197,8 @@ USE_L10N = True
 STATIC_URL = '/static/'
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# collectstatic кладёт рядом с файлами сжатые .gz и .br для nginx
+STATICFILES_STORAGE = 'api.storage.CompressedStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -113,24 +209,37 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
+    ],
+
+    # orjson, если установлен, иначе json из стандартной библиотеки
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
 
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.UserRateThrottle',
-        'rest_framework.throttling.ScopedRateThrottle',
+        'api.throttling.UserRateThrottle',
+        'api.throttling.ScopedRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'user': '1000/day',
-        'anon': '100/day',
-        'low_request': '20/minute',
+        'user': os.getenv('THROTTLE_RATE_USER', '1000/day'),
+        'anon': os.getenv('THROTTLE_RATE_ANON', '100/day'),
+        'low_request': os.getenv('THROTTLE_RATE_LOW_REQUEST', '20/minute'),
     }
 }
 
 SIMPLE_JWT = {
-    'ACCESS_TOKEN_LIFETIME': timedelta(days=120),
+    # отзыв токенов - через User.token_version, а не срок жизни
+    'ACCESS_TOKEN_LIFETIME': timedelta(
+        days=int(os.getenv('JWT_ACCESS_TOKEN_DAYS', 120))),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+
+# Сколько секунд версия токенов пользователя (User.token_version)
+# читается из кэша: столько ещё может приниматься токен, отозванный
+# в другом процессе при кэше LocMem
+JWT_VERSION_CACHE_TTL = int(os.getenv('JWT_VERSION_CACHE_TTL', 60))
@@ -0,0 +1,16 @@
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+# gthread: запросы, ждущие базу или кэш, не занимают процесс целиком,
+# а потоки делят память воркера. Для ASGI (api_yamdb.asgi:application)
+# укажите uvicorn.workers.UvicornWorker, потоки задаёт ASGI_THREADS.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+# перезапуск воркеров ограничивает рост памяти
+max_requests = 1000
+max_requests_jitter = 100
+worker_tmp_dir = '/dev/shm'
@@ -1,11 +1,25 @@
 from django.contrib import admin
 
-from .models import User, Title, Category, Genre, Review, Comment
+from .models import (User, Title, Category, Genre, Review, Comment,
+                     MailMessage, TitleRanking)
+
+
+class ReviewAdmin(admin.ModelAdmin):
+    '''Админка отзывов: после правки пересчитывает сохранённый рейтинг
+    прежнего и нового произведения. Удаление учитывает post_delete.'''
+
+    def save_model(self, request, obj, form, change):
+        old_title = form.initial.get('title') if change else None
+        super().save_model(request, obj, form, change)
+        Title.objects.filter(
+            pk__in={obj.title_id, old_title} - {None}).rebuild_rating()
 
 
 admin.site.register(User)
 admin.site.register(Title)
 admin.site.register(Category)
 admin.site.register(Genre)
-admin.site.register(Review)
+admin.site.register(Review, ReviewAdmin)
 admin.site.register(Comment)
+admin.site.register(MailMessage)
+admin.site.register(TitleRanking)
@@ -1,5 +1,10 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ReviewsConfig(AppConfig):
     name = 'reviews'
+
+    def ready(self):
+        from . import rankings, signals  # noqa: F401
+        post_migrate.connect(signals.create_search_indexes, sender=self)
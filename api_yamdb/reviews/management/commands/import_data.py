@@ -0,0 +1,305 @@
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date as parse_day, parse_datetime
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.signals import bulk_changed
+
+GenreTitle = Title.genre.through
+
+# Порядок загрузки: справочники раньше ссылающихся на них данных
+SOURCES = (
+    ('users', User),
+    ('category', Category),
+    ('genre', Genre),
+    ('titles', Title),
+    ('genre_title', GenreTitle),
+    ('review', Review),
+    ('comments', Comment),
+)
+EXTENSIONS = ('.csv', '.jsonl')
+
+
+def read_rows(path):
+    '''Построчно читает CSV с заголовком или JSONL.'''
+    with open(path, encoding='utf-8', newline='') as source:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def split_slugs(value):
+    if isinstance(value, list):
+        return value
+    return [slug.strip() for slug in (value or '').split(',') if slug.strip()]
+
+
+def parse_date(value):
+    '''Дата и время из файла, дата без времени - полночь.'''
+    if not value:
+        return timezone.now()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_day(value)
+        if day is None:
+            raise ValueError(f'неверная дата {value!r}')
+        parsed = datetime.combine(day, datetime.min.time())
+    if timezone.is_aware(parsed) and not settings.USE_TZ:
+        parsed = timezone.make_naive(parsed)
+    return parsed
+
+
+@contextmanager
+def keep_pub_date(model):
+    '''Не даёт auto_now_add затереть pub_date из файла.'''
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая загрузка данных из CSV/JSONL. В каталоге ищутся файлы '
+        'users, category, genre, titles, genre_title, review, comments. '
+        'Категории и жанры задаются slug, авторы - username, произведения '
+        'и отзывы - id из файлов titles и review. У комментариев id '
+        'обязателен, иначе --resume вставил бы их повторно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог с файлами данных')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Сколько строк вставлять одним bulk_create'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продолжить с места, сохранённого в файле состояния'
+        )
+        parser.add_argument(
+            '--state-file',
+            help='Файл состояния, по умолчанию .import_state.json в каталоге'
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError(f'Каталог {directory} не найден')
+        self.chunk_size = options['chunk_size']
+        self.state_file = options['state_file'] or os.path.join(
+            directory, '.import_state.json')
+        self.state = self.load_state() if options['resume'] else {}
+        self.load_maps()
+        imported = []
+        for name, model in SOURCES:
+            path = self.find_source(directory, name)
+            if path is not None:
+                self.import_source(name, model, path)
+                imported.append(model)
+        self.finish(imported)
+
+    def find_source(self, directory, name):
+        for extension in EXTENSIONS:
+            path = os.path.join(directory, name + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def load_state(self):
+        if not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file, encoding='utf-8') as state:
+            return json.load(state)
+
+    def save_state(self):
+        with open(self.state_file, 'w', encoding='utf-8') as state:
+            json.dump(self.state, state)
+
+    def load_maps(self):
+        '''Словари для замены slug и username на id без запросов к БД.'''
+        self.users = dict(User.objects.values_list('username', 'id'))
+        self.categories = dict(Category.objects.values_list('slug', 'id'))
+        self.genres = dict(Genre.objects.values_list('slug', 'id'))
+        self.titles = set(Title.objects.values_list('id', flat=True))
+        self.reviews = set(Review.objects.values_list('id', flat=True))
+
+    def import_source(self, name, model, path):
+        build = getattr(self, f'build_{name}')
+        done = self.state.get(name, 0)
+        rows = islice(read_rows(path), done, None)
+        started = time.monotonic()
+        count = skipped = 0
+        with keep_pub_date(model):
+            for chunk in chunked(rows, self.chunk_size):
+                objects = self.build_chunk(build, path, chunk, done)
+                with transaction.atomic():
+                    model.objects.bulk_create(objects, ignore_conflicts=True)
+                    self.after_chunk(name, chunk, objects)
+                done += len(chunk)
+                count += len(chunk)
+                skipped += len(chunk) - len(objects)
+                self.state[name] = done
+                self.save_state()
+                rate = count / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f'{name}: {done} строк, {rate:.0f} строк/с, '
+                    f'пропущено {skipped}'
+                )
+
+    def build_chunk(self, build, path, rows, start):
+        '''Строит объекты пачки, ошибка указывает файл и номер записи.'''
+        objects = []
+        for number, row in enumerate(rows, start + 1):
+            try:
+                obj = build(row)
+            except (KeyError, ValueError) as error:
+                raise CommandError(f'{path}, запись {number}: {error!r}')
+            if obj is not None:
+                objects.append(obj)
+        return objects
+
+    def after_chunk(self, name, chunk, objects):
+        '''Дополняет словари только что загруженными записями.'''
+        if name == 'users':
+            self.users.update(User.objects.filter(
+                username__in=[row['username'] for row in chunk]
+            ).values_list('username', 'id'))
+        elif name in ('category', 'genre'):
+            model, lookup = (
+                (Category, self.categories) if name == 'category'
+                else (Genre, self.genres)
+            )
+            lookup.update(model.objects.filter(
+                slug__in=[row['slug'] for row in chunk]
+            ).values_list('slug', 'id'))
+        elif name == 'titles':
+            self.titles.update(title.id for title in objects)
+            GenreTitle.objects.bulk_create([
+                GenreTitle(title_id=title.id, genre_id=self.genres[slug])
+                for title in objects
+                for slug in title.genre_slugs
+                if slug in self.genres
+            ], ignore_conflicts=True)
+        elif name == 'review':
+            # ignore_conflicts пропускает отзывы, повторяющие пару
+            # произведение-автор, поэтому id проверяются по базе
+            self.reviews.update(Review.objects.filter(pk__in=[
+                review.id for review in objects if review.id
+            ]).values_list('id', flat=True))
+
+    def build_users(self, row):
+        return User(
+            username=row['username'],
+            email=row['email'],
+            role=row.get('role') or User._meta.get_field('role').default,
+            bio=row.get('bio') or '',
+            first_name=row.get('first_name') or None,
+            last_name=row.get('last_name') or None,
+        )
+
+    def build_category(self, row):
+        return Category(name=row['name'], slug=row['slug'])
+
+    def build_genre(self, row):
+        return Genre(name=row['name'], slug=row['slug'])
+
+    def build_titles(self, row):
+        category = row.get('category')
+        if category and category not in self.categories:
+            return None
+        title = Title(
+            id=int(row['id']),
+            name=row['name'],
+            year=row['year'],
+            category_id=self.categories.get(category),
+            description=row.get('description') or None,
+        )
+        title.genre_slugs = split_slugs(row.get('genre'))
+        return title
+
+    def build_genre_title(self, row):
+        title_id = int(row['title_id'])
+        if title_id not in self.titles or row['genre'] not in self.genres:
+            return None
+        return GenreTitle(
+            title_id=title_id, genre_id=self.genres[row['genre']])
+
+    def build_review(self, row):
+        title_id = int(row['title_id'])
+        if title_id not in self.titles or row['author'] not in self.users:
+            return None
+        # без id повтор не вставится: пару произведение-автор
+        # проверяет ограничение unique_review
+        return Review(
+            id=row.get('id') or None,
+            title_id=title_id,
+            author_id=self.users[row['author']],
+            text=row['text'],
+            score=row['score'],
+            pub_date=parse_date(row.get('pub_date')),
+        )
+
+    def build_comments(self, row):
+        if not row.get('id'):
+            raise ValueError('у комментария нет id')
+        review_id = int(row['review_id'])
+        if review_id not in self.reviews or row['author'] not in self.users:
+            return None
+        return Comment(
+            id=row['id'],
+            review_id=review_id,
+            author_id=self.users[row['author']],
+            text=row['text'],
+            pub_date=parse_date(row.get('pub_date')),
+        )
+
+    def finish(self, models):
+        '''Сдвигает последовательности id после вставки явных id,
+        пересчитывает рейтинги и сбрасывает кэш затронутых данных.'''
+        if not models:
+            return
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+        if Review in models or Title in models:
+            call_command('rebuild_ratings', stdout=self.stdout)
+        for model in models:
+            bulk_changed.send(sender=model)
+        if os.path.exists(self.state_file):
+            os.remove(self.state_file)
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews.models import Title
+from reviews.signals import bulk_changed
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохранённые рейтинги произведений по отзывам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Сколько произведений обновлять в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = Title.objects.order_by('pk').values_list('pk', flat=True)
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(ids.filter(pk__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                updated += Title.objects.filter(
+                    pk__gte=batch[0], pk__lte=batch[-1]).rebuild_rating()
+            last_id = batch[-1]
+        bulk_changed.send(sender=Title)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено произведений: {updated}'))
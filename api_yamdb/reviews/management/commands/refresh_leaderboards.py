@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import TitleRanking
+from reviews.rankings import refresh_all
+
+
+class Command(BaseCommand):
+    help = (
+        'Полностью пересчитывает топы произведений. Байесовская оценка '
+        'обновляется только здесь, запускайте команду по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            action='append',
+            choices=tuple(dict(TitleRanking.KINDS)),
+            help='Можно указать несколько раз, по умолчанию все'
+        )
+
+    def handle(self, *args, **options):
+        refresh_all(options['kind'])
+        self.stdout.write(self.style.SUCCESS('Топы произведений обновлены'))
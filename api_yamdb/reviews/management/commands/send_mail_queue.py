@@ -0,0 +1,113 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from reviews.models import MailMessage
+
+MAX_RETRY_DELAY = 3600
+
+
+def retry_at(attempts):
+    '''Экспоненциальная задержка повтора, None - попытки исчерпаны.'''
+    if attempts >= settings.MAIL_QUEUE_MAX_ATTEMPTS:
+        return None
+    delay = min(
+        settings.MAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1),
+        MAX_RETRY_DELAY
+    )
+    return timezone.now() + timedelta(seconds=delay)
+
+
+def mark_failed(message, error):
+    '''Сохраняет ошибку, попытка уже учтена при захвате письма.'''
+    MailMessage.objects.filter(pk=message.pk).update(
+        last_error=str(error),
+        next_attempt_at=retry_at(message.attempts)
+    )
+
+
+def claim(batch_size):
+    '''Захватывает пачку готовых писем короткой транзакцией.
+    Попытка засчитывается сразу, а время следующей служит арендой:
+    другие воркеры не возьмут письма, пока она не истечёт.'''
+    with transaction.atomic():
+        messages = list(
+            MailMessage.objects.select_for_update(skip_locked=True).filter(
+                next_attempt_at__lte=timezone.now())[:batch_size]
+        )
+        for message in messages:
+            message.attempts += 1
+            message.next_attempt_at = retry_at(message.attempts)
+        MailMessage.objects.bulk_update(
+            messages, ('attempts', 'next_attempt_at'))
+    return messages
+
+
+def send_batch(connection, messages):
+    '''Отправляет пачку писем через одно соединение вне транзакции.
+    Каждое письмо сразу удаляется из очереди или помечается на повтор,
+    так что ошибка в одном письме не возвращает в очередь остальные.
+    Возвращает число отправленных.'''
+    try:
+        connection.open()
+    except Exception as error:
+        for message in messages:
+            mark_failed(message, error)
+        return 0
+    sent = 0
+    try:
+        for message in messages:
+            email = EmailMessage(
+                subject=message.subject,
+                body=message.body,
+                from_email=message.from_email,
+                to=[message.recipient],
+                connection=connection
+            )
+            try:
+                email.send()
+            except Exception as error:
+                mark_failed(message, error)
+            else:
+                MailMessage.objects.filter(pk=message.pk).delete()
+                sent += 1
+    finally:
+        connection.close()
+    return sent
+
+
+def deliver(batch_size):
+    '''Отправляет одну пачку писем, готовых к отправке.
+    Строки захватываются с арендой, поэтому воркеров можно
+    запускать несколько.'''
+    messages = claim(batch_size)
+    if messages:
+        send_batch(get_connection(fail_silently=False), messages)
+    return len(messages)
+
+
+class Command(BaseCommand):
+    help = 'Фоновая отправка писем из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь и завершиться'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = settings.MAIL_QUEUE_BATCH_SIZE
+        while True:
+            processed = deliver(batch_size)
+            if processed:
+                self.stdout.write(f'Обработано писем: {processed}')
+                continue
+            if options['once']:
+                break
+            time.sleep(settings.MAIL_QUEUE_POLL_INTERVAL)
@@ -1,6 +1,13 @@
+from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, SearchVectorField,
+                                            TrigramSimilarity)
+from django.db import connections, models
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, NullIf, Upper
+from django.utils import timezone
 
 from .validators import validate_year
 
@@ -56,6 +63,12 @@ class User(AbstractUser):
     is_staff = models.BooleanField(
         default=False
     )
+    # увеличивается при смене роли и флагов: выданные с прежней
+    # версией токены больше не принимаются
+    token_version = models.PositiveIntegerField(
+        default=0,
+        editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
@@ -112,6 +125,61 @@ class Genre(models.Model):
         return self.slug
 
 
+class TitleQuerySet(models.QuerySet):
+    """Операции с сохранённым рейтингом произведений"""
+
+    def change_rating(self, score=0, count=0):
+        """Инкрементально меняет сумму оценок, число отзывов и рейтинг."""
+        return self.update(
+            score_sum=F('score_sum') + score,
+            reviews_count=F('reviews_count') + count,
+            rating=(F('score_sum') + score) / NullIf(
+                F('reviews_count') + count, 0)
+        )
+
+    def rebuild_rating(self):
+        """Пересчитывает рейтинг по всем отзывам одним UPDATE."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')).order_by().values('title')
+        return self.update(
+            score_sum=Coalesce(Subquery(
+                reviews.annotate(total=Sum('score')).values('total')), 0),
+            reviews_count=Coalesce(Subquery(
+                reviews.annotate(total=Count('id')).values('total')), 0),
+            rating=Subquery(reviews.annotate(
+                total=Sum('score') / Count('id')).values('total'))
+        )
+
+    def update_search_vector(self):
+        """Пересчитывает поисковый вектор (только PostgreSQL)."""
+        if connections[self.db].vendor != 'postgresql':
+            return 0
+        config = settings.TITLE_SEARCH_CONFIG
+        return self.update(search_vector=(
+            SearchVector('name', weight='A', config=config)
+            + SearchVector('description', weight='B', config=config)
+        ))
+
+    def search(self, tokens, text):
+        """Полнотекстовый поиск по префиксам слов с ранжированием,
+        при включённом pg_trgm - ещё и нечёткий по названию."""
+        query = SearchQuery(
+            ' & '.join(f'{token}:*' for token in tokens),
+            search_type='raw',
+            config=settings.TITLE_SEARCH_CONFIG
+        )
+        rank = SearchRank(F('search_vector'), query)
+        condition = Q(search_vector=query)
+        queryset = self
+        if settings.TITLE_SEARCH_TRIGRAM:
+            # UPPER(name) - то же выражение, что в триграммном индексе
+            queryset = queryset.annotate(upper_name=Upper('name'))
+            rank = rank + TrigramSimilarity('upper_name', text.upper())
+            condition |= Q(upper_name__trigram_similar=text.upper())
+        return queryset.annotate(rank=rank).filter(condition).order_by(
+            '-rank', '-name')
+
+
 class Title(models.Model):
     """Произведения, к которым пишут отзывы"""
     name = models.CharField(
@@ -120,8 +188,7 @@ class Title(models.Model):
         db_index=True)
     year = models.PositiveSmallIntegerField(
         verbose_name='год',
-        validators=(validate_year,),
-        db_index=True
+        validators=(validate_year,)
     )
     category = models.ForeignKey(
         Category,
@@ -129,7 +196,9 @@ class Title(models.Model):
         blank=True,
         null=True,
         related_name='titles',
-        verbose_name='категория'
+        verbose_name='категория',
+        # покрыт индексом title_category_year_idx
+        db_index=False
     )
     genre = models.ManyToManyField(
         Genre,
@@ -142,11 +211,40 @@ class Title(models.Model):
         null=True,
         blank=True
     )
+    rating = models.PositiveSmallIntegerField(
+        verbose_name='рейтинг',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    score_sum = models.PositiveIntegerField(
+        verbose_name='сумма оценок',
+        default=0,
+        editable=False
+    )
+    reviews_count = models.PositiveIntegerField(
+        verbose_name='количество отзывов',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         ordering = ('name',)
+        indexes = (
+            # фильтр ?category=&year= с сортировкой по названию
+            models.Index(
+                fields=('category', 'year', 'name'),
+                name='title_category_year_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -158,7 +256,9 @@ class Review(models.Model):
         Title,
         on_delete=models.CASCADE,
         related_name='reviews',
-        verbose_name='произведение'
+        verbose_name='произведение',
+        # покрыт индексом review_title_pub_date_idx
+        db_index=False
     )
     text = models.TextField(max_length=200)
     author = models.ForeignKey(
@@ -176,8 +276,7 @@ class Review(models.Model):
     )
     pub_date = models.DateTimeField(
         'Дата публикации',
-        auto_now_add=True,
-        db_index=True
+        auto_now_add=True
     )
 
     class Meta:
@@ -185,6 +284,13 @@ class Review(models.Model):
         verbose_name_plural = 'Отзывы'
         default_related_name = 'reviews'
         ordering = ('pub_date',)
+        indexes = (
+            # отзывы произведения по дате, в том числе курсором
+            models.Index(
+                fields=('title', 'pub_date', 'id'),
+                name='review_title_pub_date_idx'
+            ),
+        )
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author', ],
@@ -201,7 +307,9 @@ class Comment(models.Model):
         Review,
         on_delete=models.CASCADE,
         related_name='comments',
-        verbose_name='отзыв'
+        verbose_name='отзыв',
+        # покрыт индексом comment_review_pub_date_idx
+        db_index=False
     )
     text = models.CharField(max_length=200)
     author = models.ForeignKey(
@@ -211,14 +319,87 @@ class Comment(models.Model):
     )
     pub_date = models.DateTimeField(
         'Дата публикации',
-        auto_now_add=True,
-        db_index=True
+        auto_now_add=True
     )
 
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('pub_date',)
+        indexes = (
+            # комментарии отзыва по дате, в том числе курсором
+            models.Index(
+                fields=('review', 'pub_date', 'id'),
+                name='comment_review_pub_date_idx'
+            ),
+        )
 
     def __str__(self):
         return f'{self.pk}: {self.text[:30]}'
+
+
+class MailMessage(models.Model):
+    """Письмо в очереди на отправку.
+    Отправленные письма удаляются, у исчерпавших попытки
+    next_attempt_at сбрасывается в NULL."""
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    from_email = models.EmailField()
+    recipient = models.EmailField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        null=True,
+        db_index=True
+    )
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Очередь писем'
+        ordering = ('next_attempt_at',)
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
+
+
+class TitleRanking(models.Model):
+    """Материализованный топ произведений: строка на место в рейтинге.
+    scope - 'all', 'genre:<slug>' или 'category:<slug>'."""
+    RATING = 'rating'
+    REVIEWS = 'reviews'
+    WEIGHTED = 'weighted'
+    KINDS = (
+        (RATING, 'Средняя оценка'),
+        (REVIEWS, 'Число отзывов'),
+        (WEIGHTED, 'Байесовская оценка'),
+    )
+    kind = models.CharField(max_length=10, choices=KINDS)
+    # 'category:' и slug до 100 символов
+    scope = models.CharField(max_length=110)
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='rankings'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Рейтинги произведений'
+        ordering = ('kind', 'scope', '-score', 'title_id')
+        indexes = (
+            models.Index(
+                fields=('kind', 'scope', '-score', 'title'),
+                name='title_ranking_top_idx'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('kind', 'scope', 'title'),
+                name='unique_title_ranking'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.kind} {self.scope}: {self.title_id} ({self.score})'
@@ -0,0 +1,261 @@
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import (Count, ExpressionWrapper, F, FloatField, Min,
+                              Sum, Value)
+from django.db.models.functions import Cast
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Category, Genre, Review, Title, TitleRanking
+from .signals import bulk_changed
+
+# Рейтинги, которые обновляются сразу после записи отзыва. Байесовская
+# оценка зависит от средней оценки по всем произведениям и меняется
+# у всех сразу, её пересчитывает периодический refresh_leaderboards.
+INCREMENTAL_KINDS = (TitleRanking.RATING, TitleRanking.REVIEWS)
+
+
+def mean_score():
+    totals = Title.objects.aggregate(
+        score=Sum('score_sum'), count=Sum('reviews_count'))
+    if not totals['count']:
+        return 0
+    return totals['score'] / totals['count']
+
+
+def score_expression(kind, mean=None):
+    '''SQL-выражение оценки по сохранённым агрегатам произведения.'''
+    score_sum = Cast(F('score_sum'), FloatField())
+    if kind == TitleRanking.RATING:
+        expression = score_sum / F('reviews_count')
+    elif kind == TitleRanking.REVIEWS:
+        expression = Cast(F('reviews_count'), FloatField())
+    else:
+        # (v * R + m * C) / (v + m): при малом числе отзывов v оценка
+        # тянется к средней C, пока отзывов не станет больше m
+        votes = settings.LEADERBOARD_MIN_VOTES
+        expression = (score_sum + Value(votes * mean)) / (
+            F('reviews_count') + Value(votes))
+    return ExpressionWrapper(expression, output_field=FloatField())
+
+
+def scope_titles(scope):
+    if scope == 'all':
+        return Title.objects.all()
+    field, slug = scope.split(':', 1)
+    return Title.objects.filter(**{f'{field}__slug': slug})
+
+
+def all_scopes():
+    return ['all'] + [
+        f'genre:{slug}' for slug in Genre.objects.values_list(
+            'slug', flat=True)
+    ] + [
+        f'category:{slug}' for slug in Category.objects.values_list(
+            'slug', flat=True)
+    ]
+
+
+def title_scopes(title):
+    scopes = ['all'] + [
+        f'genre:{slug}' for slug in title.genre.values_list('slug', flat=True)
+    ]
+    if title.category_id is not None:
+        scopes.append(f'category:{title.category.slug}')
+    return scopes
+
+
+def board(kind, scope):
+    return TitleRanking.objects.filter(kind=kind, scope=scope)
+
+
+def lock_boards(boards):
+    '''Блокирует топы (kind, scope) до конца транзакции: топ читается
+    и меняется одним запросом за раз. Блокировки берутся в одном
+    порядке, чтобы запросы с общими областями не ждали друг друга
+    по кругу. SQLite и так выполняет записи по одной.'''
+    connection = connections[router.db_for_write(TitleRanking)]
+    if connection.vendor != 'postgresql':
+        return
+    keys = sorted(f'leaderboard:{kind}:{scope}' for kind, scope in boards)
+    with connection.cursor() as cursor:
+        # unnest отдаёт ключи в порядке массива, все блокировки
+        # берутся одним запросом
+        cursor.execute(
+            'SELECT pg_advisory_xact_lock(hashtext(key)) '
+            'FROM unnest(%s::text[]) AS key', [keys])
+
+
+def add_rankings(kind, scope, rows):
+    '''Добавляет места rows: список (id произведения, оценка). Место,
+    которое уже записал параллельный запрос, не трогается.'''
+    TitleRanking.objects.bulk_create(
+        [
+            TitleRanking(
+                kind=kind, scope=scope, title_id=title_id, score=score)
+            for title_id, score in rows
+        ],
+        ignore_conflicts=True
+    )
+
+
+def write_scope(kind, scope, rows):
+    '''Приводит топ области к rows: удаляет выбывшие места, меняет
+    оценки и добавляет новые. Строки не пересоздаются, поэтому
+    параллельная запись в ту же область не нарушает
+    unique_title_ranking.'''
+    rows = dict(rows)
+    board(kind, scope).exclude(title_id__in=rows).delete()
+    changed = []
+    for ranking in board(kind, scope).filter(title_id__in=rows):
+        score = rows.pop(ranking.title_id)
+        if ranking.score != score:
+            ranking.score = score
+            changed.append(ranking)
+    if changed:
+        TitleRanking.objects.bulk_update(changed, ('score',))
+    add_rankings(kind, scope, rows.items())
+
+
+def trim_scope(kind, scope):
+    '''Удаляет места за пределами LEADERBOARD_SIZE.'''
+    tail = list(board(kind, scope).order_by('-score', 'title_id').values_list(
+        'pk', flat=True)[settings.LEADERBOARD_SIZE:])
+    if tail:
+        TitleRanking.objects.filter(pk__in=tail).delete()
+
+
+def rank_scope(kind, scope, mean=None):
+    '''Топ области целиком, по убыванию оценки.'''
+    return list(
+        scope_titles(scope).filter(reviews_count__gt=0).annotate(
+            ranking_score=score_expression(kind, mean)
+        ).order_by('-ranking_score', 'id').values_list(
+            'id', 'ranking_score')[:settings.LEADERBOARD_SIZE]
+    )
+
+
+def refresh_scope(kind, scope, mean=None):
+    with transaction.atomic():
+        lock_boards([(kind, scope)])
+        write_scope(kind, scope, rank_scope(kind, scope, mean))
+
+
+def title_score(kind, title):
+    '''Оценка произведения в рейтинге kind, как score_expression.'''
+    if not title.reviews_count:
+        return None
+    if kind == TitleRanking.RATING:
+        return title.score_sum / title.reviews_count
+    return float(title.reviews_count)
+
+
+def title_action(score, old, size, last):
+    '''Что сделать с местом произведения в одном топе: 'add',
+    'displace' (добавить в полный топ и вытеснить последнего),
+    'update', 'remove', 'refresh' (пересчитать топ) или None.'''
+    full = size >= settings.LEADERBOARD_SIZE
+    if old is None:
+        if score is None or full and score < last:
+            return None
+        return 'displace' if full else 'add'
+    if full and (score is None or score < old):
+        # произведение теряет место, его может обогнать кто-то
+        # за пределами топа
+        return 'refresh'
+    if score is None:
+        return 'remove'
+    return 'update' if score != old else None
+
+
+def merge_title(title, scopes):
+    '''Обновляет только места одного произведения во всех его областях:
+    топы читаются одним запросом по размеру и последнему месту, записи
+    группируются по рейтингу. Возвращает True, если топы изменились.'''
+    boards = TitleRanking.objects.filter(
+        kind__in=INCREMENTAL_KINDS, scope__in=scopes)
+    sizes = {
+        (row['kind'], row['scope']): (row['size'], row['last'])
+        for row in boards.order_by().values('kind', 'scope').annotate(
+            size=Count('id'), last=Min('score'))
+    }
+    current = {
+        (kind, scope): score for kind, scope, score in boards.filter(
+            title_id=title.pk).values_list('kind', 'scope', 'score')
+    }
+    changed = False
+    for kind in INCREMENTAL_KINDS:
+        score = title_score(kind, title)
+        actions = {}
+        for scope in scopes:
+            action = title_action(
+                score, current.get((kind, scope)),
+                *sizes.get((kind, scope), (0, None)))
+            actions.setdefault(action, []).append(scope)
+        actions.pop(None, None)
+        changed = changed or bool(actions)
+        rankings = TitleRanking.objects.filter(kind=kind, title_id=title.pk)
+        if 'update' in actions:
+            rankings.filter(scope__in=actions['update']).update(score=score)
+        if 'remove' in actions:
+            rankings.filter(scope__in=actions['remove']).delete()
+        added = actions.get('add', []) + actions.get('displace', [])
+        if added:
+            TitleRanking.objects.bulk_create(
+                [
+                    TitleRanking(
+                        kind=kind, scope=scope, title_id=title.pk,
+                        score=score)
+                    for scope in added
+                ],
+                ignore_conflicts=True
+            )
+        for scope in actions.get('displace', ()):
+            trim_scope(kind, scope)
+        for scope in actions.get('refresh', ()):
+            refresh_scope(kind, scope)
+    return changed
+
+
+def refresh_title(title_id):
+    '''Обновляет рейтинги средней оценки и числа отзывов во всех
+    областях произведения после изменения его отзывов.'''
+    title = Title.objects.select_related('category').filter(
+        pk=title_id).first()
+    if title is None:
+        return
+    scopes = title_scopes(title)
+    with transaction.atomic():
+        lock_boards(
+            (kind, scope) for kind in INCREMENTAL_KINDS for scope in scopes)
+        changed = merge_title(title, scopes)
+    if changed:
+        bulk_changed.send(sender=TitleRanking)
+
+
+def refresh_all(kinds=None):
+    '''Полный пересчёт всех рейтингов во всех областях.'''
+    mean = mean_score()
+    scopes = all_scopes()
+    for kind in kinds or dict(TitleRanking.KINDS):
+        for scope in scopes:
+            refresh_scope(kind, scope, mean)
+        # области удалённых жанров и категорий
+        TitleRanking.objects.filter(kind=kind).exclude(
+            scope__in=scopes).delete()
+    bulk_changed.send(sender=TitleRanking)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, raw=False, **kwargs):
+    # после коммита сохранённые агрегаты произведения уже обновлены
+    if not raw:
+        title_id = instance.title_id
+        transaction.on_commit(lambda: refresh_title(title_id))
+
+
+@receiver(bulk_changed, sender=Title)
+def ratings_bulk_changed(sender, rankings=True, **kwargs):
+    if rankings:
+        transaction.on_commit(refresh_all)
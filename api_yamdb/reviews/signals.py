@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .models import Review, Title
+
+# Отправляется после массовых операций (bulk_create, update), которые
+# не вызывают post_save/post_delete; sender - модель изменённых данных.
+bulk_changed = Signal()
+
+# GIN-индексы PostgreSQL: поисковый вектор и триграммы для icontains.
+# Создаются после migrate, а не в Meta.indexes, чтобы схема
+# по-прежнему создавалась на SQLite.
+SEARCH_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS reviews_title_search_vector_gin '
+    'ON reviews_title USING gin (search_vector)',
+)
+TRIGRAM_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS {table}_name_trgm '
+    'ON {table} USING gin (UPPER(name::text) gin_trgm_ops)'.format(
+        table=table)
+    for table in ('reviews_title', 'reviews_category', 'reviews_genre')
+)
+
+
+def create_search_indexes(using='default', **kwargs):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for sql in SEARCH_INDEXES:
+            cursor.execute(sql)
+        if not settings.TITLE_SEARCH_TRIGRAM:
+            return
+        try:
+            with transaction.atomic(using=using):
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                for sql in TRIGRAM_INDEXES:
+                    cursor.execute(sql)
+        except DatabaseError:
+            # нет прав на создание расширения - остаётся полнотекстовый
+            # поиск, нечёткий поиск нужно отключить в настройках
+            pass
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Title.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(bulk_changed, sender=Title)
+def titles_bulk_changed(sender, **kwargs):
+    Title.objects.filter(search_vector__isnull=True).update_search_vector()
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    # отзывы удаляются и каскадом (вместе с автором или из админки),
+    # поэтому сохранённый рейтинг уменьшается здесь, а не во view
+    Title.objects.filter(pk=instance.title_id).change_rating(
+        score=-instance.score, count=-1)
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from asgiref.testing import ApplicationCommunicator
+from asgiref.wsgi import WsgiToAsgiInstance
+from django.core.signals import request_finished
+
+from api_yamdb.asgi import application
+
+
+async def get(path):
+    communicator = ApplicationCommunicator(application, {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'testserver')],
+    })
+    await communicator.send_input({'type': 'http.request'})
+    start = await communicator.receive_output(timeout=5)
+    body = await communicator.receive_output(timeout=5)
+    # приложение завершается после отправки тела
+    await communicator.wait(timeout=5)
+    return start['status'], body['body']
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsgi:
+
+    def test_request_through_asgi(self):
+        status, body = asyncio.run(get('/api/v1/categories/'))
+        assert status == 200, (
+            'Проверьте, что API отвечает через ASGI-приложение'
+        )
+        assert b'"results"' in body
+
+    def test_request_finished_sent(self):
+        finished = []
+
+        def receiver(**kwargs):
+            finished.append(True)
+
+        request_finished.connect(receiver)
+        try:
+            status, _ = asyncio.run(get('/api/v1/categories/'))
+        finally:
+            request_finished.disconnect(receiver)
+        assert status == 200
+        assert finished, (
+            'Проверьте, что ASGI-приложение закрывает ответ WSGI и Django '
+            'отправляет request_finished'
+        )
+
+
+class TestAsgirefApi:
+
+    def test_build_environ_available(self):
+        # ThreadPoolWsgiToAsgiInstance берёт из asgiref только его
+        assert callable(getattr(WsgiToAsgiInstance, 'build_environ', None)), (
+            'Проверьте, что обновлённый asgiref сохранил '
+            'WsgiToAsgiInstance.build_environ, или перенесите его в asgi.py'
+        )
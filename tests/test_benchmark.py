@@ -0,0 +1,41 @@
+import pytest
+
+from api import benchmark
+
+
+class TestBenchmarkReport:
+
+    def test_percentiles(self):
+        latencies = [i / 1000 for i in range(1, 101)]
+        result = benchmark.summary(latencies, 1)
+        assert (result['p50_ms'], result['p95_ms'], result['p99_ms']) == (
+            50, 95, 99)
+        assert result['rps'] == 100
+
+    def test_compare_finds_regressions(self):
+        baseline = {'results': {
+            'client:titles_list': {'p95_ms': 10, 'queries': 3},
+            'client:title_detail': {'p95_ms': 10, 'queries': 2},
+            'http:titles_list': {'p95_ms': 10},
+        }}
+        current = {'results': {
+            'client:titles_list': {'p95_ms': 11, 'queries': 3},
+            'client:title_detail': {'p95_ms': 9, 'queries': 4},
+            'http:titles_list': {'p95_ms': 15},
+        }}
+        _, regressions = benchmark.compare(baseline, current, 20)
+        assert regressions == ['client:title_detail', 'http:titles_list'], (
+            'Проверьте, что регрессией считается рост p95 сверх порога '
+            'и рост числа SQL-запросов'
+        )
+
+
+@pytest.mark.django_db
+class TestBenchmarkScenarios:
+
+    def test_scenarios_on_tiny_dataset(self):
+        data = benchmark.seed('tiny')
+        for name in benchmark.SCENARIOS:
+            result = benchmark.run_client(name, 3, data)
+            assert result['requests'] == 3
+            assert result['queries'] > 0, name
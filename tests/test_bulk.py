@@ -0,0 +1,182 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework.validators import UniqueValidator
+
+from api import cache as api_cache
+from reviews import rankings
+from reviews.models import Category, Genre, Title, User
+
+
+@pytest.fixture
+def admin_client():
+    admin = User.objects.create_user(
+        username='admin', email='admin@ya.ru', role='admin')
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+@pytest.fixture
+def catalog():
+    Category.objects.create(name='Фильм', slug='movie')
+    Genre.objects.create(name='Драма', slug='drama')
+    Genre.objects.create(name='Комедия', slug='comedy')
+
+
+def titles(count, start=0):
+    return [
+        {
+            'name': f'Произведение {i}',
+            'year': 2000 + i % 20,
+            'category': 'movie',
+            'genre': ['drama', 'comedy'] if i % 2 else ['drama'],
+            'description': f'Описание {i}',
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def batch_queries(context):
+    '''Запросы пакета без построчных INSERT произведений, которыми
+    пакет пишется на базах, не возвращающих id из bulk_create.'''
+    queries = [query['sql'] for query in context.captured_queries]
+    if not connection.features.can_return_ids_from_bulk_insert:
+        queries = [
+            sql for sql in queries
+            if not sql.startswith('INSERT INTO "reviews_title" (')
+        ]
+    return len(queries)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBulkWrite:
+
+    def test_create_titles(self, admin_client, catalog):
+        counts = []
+        for items in (titles(5), titles(100, 5)):
+            with CaptureQueriesContext(connection) as context:
+                response = admin_client.post(
+                    '/api/v1/titles/bulk/', items, format='json')
+            assert response.status_code == 201
+            counts.append(batch_queries(context))
+        assert counts[0] == counts[1] <= 12, (
+            'Проверьте, что число запросов не зависит от размера пакета'
+        )
+        assert Title.objects.count() == 105
+        title = Title.objects.get(name='Произведение 7')
+        assert sorted(title.genre.values_list('slug', flat=True)) == [
+            'comedy', 'drama']
+        assert response.data[2] == {
+            'id': title.id,
+            'genre': ['drama', 'comedy'],
+            'category': 'movie',
+            'name': 'Произведение 7',
+            'year': 2007,
+            'description': 'Описание 7',
+        }
+
+    def test_errors_by_position(self, admin_client, catalog):
+        items = titles(3)
+        items[1]['category'] = 'book'
+        items[2]['year'] = 3000
+        response = admin_client.post(
+            '/api/v1/titles/bulk/', items, format='json')
+        assert response.status_code == 400
+        assert response.data[0] == {}
+        assert list(response.data[1]) == ['category']
+        assert list(response.data[2]) == ['year']
+        assert not Title.objects.exists(), (
+            'Проверьте, что пакет с ошибками не записывается'
+        )
+
+    def test_update_titles(self, admin_client, catalog):
+        admin_client.post('/api/v1/titles/bulk/', titles(3), format='json')
+        first, second, third = Title.objects.order_by('id')
+        response = admin_client.patch('/api/v1/titles/bulk/', [
+            {'id': first.id, 'name': 'Новое имя'},
+            {'id': second.id, 'genre': ['drama']},
+        ], format='json')
+        assert response.status_code == 200
+        first.refresh_from_db()
+        assert first.name == 'Новое имя'
+        assert first.year == 2000
+        assert list(second.genre.values_list('slug', flat=True)) == ['drama']
+        response = admin_client.patch('/api/v1/titles/bulk/', [
+            {'id': third.id, 'name': 'Ещё имя'},
+            {'name': 'Без id'},
+            {'id': 0, 'year': 2001},
+        ], format='json')
+        assert response.status_code == 400
+        assert response.data[0] == {}
+        assert list(response.data[1]) == ['id']
+        assert list(response.data[2]) == ['id']
+        third.refresh_from_db()
+        assert third.name == 'Произведение 2'
+
+    def test_rankings_refreshed_only_for_scope_changes(
+            self, admin_client, catalog, monkeypatch):
+        refreshes = []
+        monkeypatch.setattr(
+            rankings, 'refresh_all', lambda: refreshes.append(True))
+        admin_client.post('/api/v1/titles/bulk/', titles(2), format='json')
+        first, second = Title.objects.order_by('id')
+        admin_client.patch('/api/v1/titles/bulk/', [
+            {'id': first.id, 'name': 'Новое имя', 'year': 2001},
+            {'id': second.id, 'description': 'Новое описание'},
+        ], format='json')
+        assert not refreshes, (
+            'Проверьте, что правка названия, года и описания не '
+            'пересчитывает топы'
+        )
+        admin_client.patch('/api/v1/titles/bulk/', [
+            {'id': first.id, 'genre': ['comedy']},
+        ], format='json')
+        assert refreshes == [True], (
+            'Проверьте, что смена жанров пересчитывает топы'
+        )
+
+    def test_genres_and_categories(self, admin_client, catalog):
+        response = admin_client.post('/api/v1/genres/bulk/', [
+            {'name': 'Ужасы', 'slug': 'horror'},
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Страх', 'slug': 'horror'},
+        ], format='json')
+        assert response.status_code == 400
+        assert response.data[0] == {}
+        assert response.data[1] == {'slug': [UniqueValidator.message]}
+        assert response.data[2] == {'slug': [UniqueValidator.message]}
+        response = admin_client.post('/api/v1/categories/bulk/', [
+            {'name': 'Книга', 'slug': 'book'},
+            {'name': 'Музыка', 'slug': 'music'},
+        ], format='json')
+        assert response.status_code == 201
+        assert response.data == [
+            {'name': 'Книга', 'slug': 'book'},
+            {'name': 'Музыка', 'slug': 'music'},
+        ]
+        response = admin_client.patch('/api/v1/categories/bulk/', [
+            {'name': 'Книги', 'slug': 'book'},
+        ], format='json')
+        assert response.status_code == 200
+        assert Category.objects.get(slug='book').name == 'Книги'
+
+    def test_cache_versions_bumped(self, admin_client, catalog):
+        before = cache.get(api_cache.VERSION_KEY.format('titles'))
+        admin_client.post('/api/v1/titles/bulk/', titles(2), format='json')
+        assert cache.get(api_cache.VERSION_KEY.format('titles')) != before, (
+            'Проверьте, что пакетная запись сбрасывает кэш списка '
+            'произведений'
+        )
+
+    def test_permissions_and_format(self, admin_client):
+        response = APIClient().post(
+            '/api/v1/genres/bulk/', [{'name': 'Ужасы', 'slug': 'horror'}],
+            format='json')
+        assert response.status_code == 401
+        response = admin_client.post(
+            '/api/v1/genres/bulk/', {'name': 'Ужасы'}, format='json')
+        assert response.status_code == 400
+        assert 'non_field_errors' in response.data
@@ -0,0 +1,57 @@
+import pytest
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Genre, Review, Title, User
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCatalogCache:
+
+    def test_category_list_cached_and_invalidated(
+            self, django_assert_num_queries):
+        client = APIClient()
+        Category.objects.create(name='Книги', slug='books')
+        assert client.get('/api/v1/categories/').data['count'] == 1
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/categories/')
+        assert response.data['count'] == 1, (
+            'Проверьте, что повторный запрос списка категорий берётся из кэша'
+        )
+
+        Category.objects.create(name='Фильмы', slug='films')
+        assert client.get('/api/v1/categories/').data['count'] == 2, (
+            'Проверьте, что кэш категорий сбрасывается при изменении данных'
+        )
+
+    def test_title_cache_invalidated_by_related_models(self):
+        client = APIClient()
+        genre = Genre.objects.create(name='Рок', slug='rock')
+        title = Title.objects.create(name='Песня', year=2000)
+        url = f'/api/v1/titles/{title.id}/'
+        assert client.get(url).data['genre'] == []
+
+        title.genre.add(genre)
+        assert client.get(url).data['genre'] == [
+            {'name': 'Рок', 'slug': 'rock'}
+        ]
+
+        genre.name = 'Рок-н-ролл'
+        genre.save()
+        assert client.get(url).data['genre'][0]['name'] == 'Рок-н-ролл'
+
+        author = User.objects.create(username='author', email='a@ya.ru')
+        Review.objects.create(title=title, author=author, text='-', score=7)
+        Title.objects.filter(pk=title.pk).rebuild_rating()
+        assert client.get(url).data['rating'] == 7, (
+            'Проверьте, что кэш произведений сбрасывается при новом отзыве'
+        )
+
+    def test_authenticated_title_requests_bypass_cache(
+            self, django_assert_num_queries):
+        user = User.objects.create(username='reader', email='r@ya.ru')
+        Title.objects.create(name='Книга', year=2000)
+        client = APIClient()
+        client.force_authenticate(user)
+        client.get('/api/v1/titles/')
+        with django_assert_num_queries(3):
+            client.get('/api/v1/titles/')
@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from reviews.models import Comment, Review, Title, User
+
+
+@pytest.fixture
+def review():
+    author = User.objects.create(username='author', email='a@ya.ru')
+    title = Title.objects.create(name='Книга', year=2000)
+    return Review.objects.create(
+        title=title, author=author, text='Отзыв', score=7)
+
+
+def add_comments(review, count):
+    start = Comment.objects.count()
+    for i in range(start, start + count):
+        user = User.objects.create(username=f'reader{i}', email=f'{i}@ya.ru')
+        Comment.objects.create(review=review, author=user, text=f'{i}')
+
+
+def comments_url(review, title_id=None):
+    title_id = title_id or review.title_id
+    return f'/api/v1/titles/{title_id}/reviews/{review.id}/comments/'
+
+
+@pytest.mark.django_db
+class TestCommentQueries:
+
+    def count_list_queries(self, review):
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get(comments_url(review))
+        assert response.status_code == 200
+        return len(context.captured_queries), response
+
+    def test_list_queries_do_not_grow(self, review):
+        add_comments(review, 1)
+        few, _ = self.count_list_queries(review)
+        add_comments(review, 4)
+        many, response = self.count_list_queries(review)
+        assert few == many == 3, (
+            'Проверьте, что список комментариев загружается за постоянное '
+            'число запросов: отзыв, количество и страница'
+        )
+        assert response.data['results'][0]['review'] == 'Отзыв'
+
+    def test_review_of_other_title_not_found(self, review):
+        other = Title.objects.create(name='Другая', year=2001)
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get(comments_url(review, other.id))
+        assert response.status_code == 404, (
+            'Проверьте, что отзыв ищется только среди отзывов '
+            'произведения из URL'
+        )
+        assert len(context.captured_queries) == 1
+
+    def test_create_reuses_review(self, review):
+        client = APIClient()
+        client.force_authenticate(review.author)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(comments_url(review), {'text': 'Да'})
+        assert response.status_code == 201
+        assert response.data['review'] == 'Отзыв'
+        assert sum(
+            'FROM "reviews_review"' in query['sql']
+            for query in context.captured_queries
+        ) == 1, 'Проверьте, что отзыв загружается один раз'
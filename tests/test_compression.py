@@ -0,0 +1,72 @@
+import gzip
+
+import pytest
+from rest_framework.test import APIClient
+
+from api import compression
+from api.storage import CompressedStaticFilesStorage
+from reviews.models import Category, Title
+
+
+@pytest.fixture
+def titles():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=2000, category=category,
+              description='Длинное описание произведения ' * 5)
+        for i in range(20)
+    )
+
+
+@pytest.mark.django_db
+class TestCompressionMiddleware:
+
+    def test_gzip(self, titles):
+        client = APIClient()
+        plain = client.get('/api/v1/titles/', HTTP_ACCEPT_ENCODING='')
+        assert 'Content-Encoding' not in plain
+        response = client.get(
+            '/api/v1/titles/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        assert response['Content-Encoding'] == 'gzip', (
+            'Проверьте, что большие ответы API сжимаются gzip'
+        )
+        assert gzip.decompress(response.content) == plain.content
+        assert int(response['Content-Length']) < len(plain.content)
+        assert 'Accept-Encoding' in response['Vary']
+        assert response['ETag'] == 'W/' + plain['ETag']
+
+    @pytest.mark.skipif(compression.brotli is None, reason='нет brotli')
+    def test_brotli_preferred(self, titles):
+        response = APIClient().get(
+            '/api/v1/titles/', HTTP_ACCEPT_ENCODING='gzip, br')
+        assert response['Content-Encoding'] == 'br'
+        response = APIClient().get(
+            '/api/v1/titles/', HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        assert response['Content-Encoding'] == 'gzip'
+
+    def test_small_responses_not_compressed(self):
+        response = APIClient().get(
+            '/api/v1/categories/', HTTP_ACCEPT_ENCODING='gzip')
+        assert 'Content-Encoding' not in response, (
+            'Проверьте, что ответы меньше COMPRESSION_MIN_SIZE не сжимаются'
+        )
+        assert 'Accept-Encoding' in response['Vary']
+
+
+class TestPrecompressedStatic:
+
+    def test_collectstatic_variants(self, tmp_path):
+        spec = tmp_path / 'redoc.yaml'
+        spec.write_text('openapi: 3.0.2\n' * 500)
+        (tmp_path / 'logo.png').write_bytes(b'\x89PNG' * 500)
+        storage = CompressedStaticFilesStorage(location=str(tmp_path))
+        processed = list(storage.post_process({'redoc.yaml': None}))
+        assert processed == [('redoc.yaml', 'redoc.yaml', False)]
+        assert gzip.decompress(
+            (tmp_path / 'redoc.yaml.gz').read_bytes()
+        ) == spec.read_bytes(), (
+            'Проверьте, что collectstatic создаёт сжатые копии статики'
+        )
+        assert (tmp_path / 'redoc.yaml.br').exists() == (
+            compression.brotli is not None)
+        assert not (tmp_path / 'logo.png.gz').exists()
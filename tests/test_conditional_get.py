@@ -0,0 +1,64 @@
+import pytest
+from rest_framework.test import APIClient
+
+from reviews.models import Comment, Review, Title, User
+
+
+@pytest.fixture
+def review():
+    title = Title.objects.create(name='Книга', year=2000)
+    author = User.objects.create(username='author', email='a@ya.ru')
+    return Review.objects.create(title=title, author=author, text='-', score=5)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConditionalGet:
+
+    def test_reviews_not_modified(self, review, django_assert_num_queries):
+        client = APIClient()
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag, 'Проверьте, что список отзывов отдаётся с ETag'
+
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert not response.content
+
+        review.text = 'новый текст'
+        review.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что ETag меняется после изменения отзыва'
+        )
+        assert response['ETag'] != etag
+
+    def test_comments_etag_changes_on_new_comment(self, review):
+        client = APIClient()
+        url = (f'/api/v1/titles/{review.title_id}/reviews/'
+               f'{review.id}/comments/')
+        etag = client.get(url)['ETag']
+        Comment.objects.create(review=review, author=review.author, text='+')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.data['count'] == 1
+
+    def test_title_etag_for_authenticated_user(self, review):
+        client = APIClient()
+        client.force_authenticate(review.author)
+        url = f'/api/v1/titles/{review.title_id}/'
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        Title.objects.filter(pk=review.title_id).rebuild_rating()
+        Title.objects.get(pk=review.title_id).save()
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_wildcard_does_not_hide_missing_title(self):
+        response = APIClient().get(
+            '/api/v1/titles/999/', HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 404, (
+            'Проверьте, что If-None-Match: * не отвечает 304 '
+            'для несуществующего ресурса'
+        )
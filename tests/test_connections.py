@@ -0,0 +1,44 @@
+import pytest
+from django.db import connections
+from rest_framework.test import APIClient
+
+from api.metrics import connection_stats
+
+
+@pytest.fixture
+def stats():
+    connection_stats.reset()
+    yield connection_stats
+    connection_stats.reset()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConnections:
+
+    def test_broken_idle_connection_is_replaced(self, stats, monkeypatch):
+        client = APIClient()
+        assert client.get('/api/v1/categories/').status_code == 200
+        connection = connections['default']
+        connection.idle_since -= 3600
+        monkeypatch.setattr(connection, 'is_usable', lambda: False)
+        assert client.get('/api/v1/categories/').status_code == 200, (
+            'Проверьте, что запрос открывает новое соединение вместо '
+            'сломанного'
+        )
+        snapshot = stats.snapshot()
+        assert snapshot['requests'] == 2
+        assert snapshot['broken'] == 1
+
+    def test_recently_used_connection_is_not_checked(self, stats,
+                                                     monkeypatch):
+        client = APIClient()
+        client.get('/api/v1/categories/')
+        # первый запрос мог открыть соединение, считается только второй
+        stats.reset()
+        monkeypatch.setattr(connections['default'], 'is_usable', lambda: False)
+        client.get('/api/v1/categories/')
+        snapshot = stats.snapshot()
+        assert 'broken' not in snapshot
+        assert snapshot['reuse_rate'] == 1, (
+            'Проверьте, что соединение переиспользуется между запросами'
+        )
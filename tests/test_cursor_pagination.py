@@ -0,0 +1,91 @@
+import pytest
+from rest_framework.test import APIClient
+
+from reviews.models import Review, Title, User
+
+
+def walk(client, url, params):
+    '''Все страницы курсора по ссылкам next.'''
+    pages = []
+    response = client.get(url, params)
+    while True:
+        assert response.status_code == 200
+        pages.append(response.data)
+        if not response.data['next']:
+            return pages
+        response = client.get(response.data['next'])
+
+
+@pytest.fixture
+def titles():
+    # одинаковые названия: курсор не должен пропускать совпадения
+    names = ['Азбука', 'Буря', 'Буря', 'Буря', 'Война', 'Война', 'Гроза']
+    return [Title.objects.create(name=name, year=2000) for name in names]
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    def test_titles_cursor_pages(self, titles):
+        client = APIClient()
+        pages = walk(
+            client, '/api/v1/titles/', {'pagination': 'cursor', 'limit': 2})
+        assert all('count' not in page for page in pages), (
+            'Проверьте, что курсорная пагинация не считает COUNT(*)'
+        )
+        assert [len(page['results']) for page in pages] == [2, 2, 2, 1]
+        ids = [row['id'] for page in pages for row in page['results']]
+        expected = [
+            title.id for title in sorted(
+                titles, key=lambda title: (title.name, title.id),
+                reverse=True)
+        ]
+        assert ids == expected, (
+            'Проверьте, что страницы идут по -name, -id без пропусков '
+            'и повторов при одинаковых названиях'
+        )
+        previous = client.get(pages[1]['previous'])
+        assert [row['id'] for row in previous.data['results']] == ids[:2], (
+            'Проверьте ссылку previous'
+        )
+        assert pages[0]['previous'] is None
+
+    def test_titles_cursor_limit(self):
+        Title.objects.bulk_create(
+            Title(name=f'Книга {i}', year=2000) for i in range(105))
+        response = APIClient().get(
+            '/api/v1/titles/', {'pagination': 'cursor', 'limit': 1000})
+        assert len(response.data['results']) == 100, (
+            'Проверьте, что limit ограничен max_page_size'
+        )
+
+    def test_default_limit_offset_unchanged(self, titles):
+        response = APIClient().get('/api/v1/titles/', {'limit': 2})
+        assert set(response.data) == {'count', 'next', 'previous', 'results'}
+        assert response.data['count'] == len(titles)
+        assert 'offset=2' in response.data['next']
+
+    def test_reviews_cursor_same_pub_date(self):
+        title = Title.objects.create(name='Книга', year=2000)
+        reviews = [
+            Review.objects.create(
+                title=title, text='-', score=5,
+                author=User.objects.create(
+                    username=f'user{i}', email=f'user{i}@ya.ru'))
+            for i in range(5)
+        ]
+        Review.objects.update(pub_date=reviews[0].pub_date)
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        pages = walk(client, url, {'pagination': 'cursor', 'limit': 2})
+        assert [
+            row['id'] for page in pages for row in page['results']
+        ] == [review.id for review in reviews], (
+            'Проверьте, что отзывы с одинаковой датой не теряются '
+            'между страницами'
+        )
+        response = client.get(url)
+        assert set(response.data) == {
+            'count', 'next', 'previous', 'results'}, (
+            'Проверьте, что без ?pagination=cursor ответ прежний'
+        )
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Review, Title, User
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_export_requires_admin(self):
+        user = User.objects.create(username='reader', email='r@ya.ru')
+        client = APIClient()
+        assert client.get('/api/v1/export/titles/').status_code == 401
+        client.force_authenticate(user)
+        assert client.get('/api/v1/export/titles/').status_code == 403
+
+    def test_export_reviews_filtered_by_title(self):
+        admin = User.objects.create(
+            username='admin', email='admin@ya.ru', role='admin')
+        books = Category.objects.create(name='Книги', slug='books')
+        book = Title.objects.create(name='Книга', year=2000, category=books)
+        film = Title.objects.create(name='Фильм', year=2000)
+        for title in (book, film):
+            Review.objects.create(
+                title=title, author=admin, text='-', score=5)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.get('/api/v1/export/reviews/?category=books')
+        assert response.status_code == 200
+        rows = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).decode().splitlines()
+        ]
+        assert [row['title_id'] for row in rows] == [book.id]
+        assert rows[0]['author'] == 'admin'
+
+        response = client.get('/api/v1/export/titles/?output=csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert lines[0].startswith('id,name,year,category,genre')
+        assert len(lines) == 3
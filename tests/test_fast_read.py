@@ -0,0 +1,91 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+
+@pytest.fixture
+def catalog():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [
+        Genre.objects.create(name=name, slug=slug)
+        for name, slug in (('Драма', 'drama'), ('Комедия', 'comedy'),
+                           ('Боевик', 'action'))
+    ]
+    authors = [
+        User.objects.create_user(username=f'user{i}', email=f'u{i}@ya.ru')
+        for i in range(3)
+    ]
+    titles = []
+    for i in range(6):
+        title = Title.objects.create(
+            name=f'Мастер {i}',
+            year=1990 + i,
+            category=category if i % 3 else None,
+            description='Описание' if i % 2 else None
+        )
+        title.genre.set(genres[:i % 4])
+        titles.append(title)
+    title = titles[1]
+    for author in authors:
+        review = Review.objects.create(
+            title=title, author=author, text=f'Отзыв {author}',
+            score=author.id % 10 + 1)
+        Comment.objects.create(
+            review=review, author=authors[0], text='Комментарий')
+    Title.objects.rebuild_rating()
+    return title, review
+
+
+@pytest.mark.django_db
+class TestFastRead:
+
+    def fetch(self, settings, url, fast):
+        settings.FAST_READ_PATH = fast
+        cache.clear()
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='user0'))
+        response = client.get(url)
+        assert response.status_code == 200, url
+        return response.content
+
+    def urls(self, title, review):
+        reviews = f'/api/v1/titles/{title.id}/reviews/'
+        comments = f'{reviews}{review.id}/comments/'
+        return (
+            '/api/v1/titles/',
+            '/api/v1/titles/?limit=2&offset=1',
+            '/api/v1/titles/?genre=drama',
+            '/api/v1/titles/?search=мастер',
+            '/api/v1/titles/?pagination=cursor&limit=2',
+            f'/api/v1/titles/{title.id}/',
+            reviews,
+            f'{reviews}?pagination=cursor',
+            f'{reviews}{review.id}/',
+            comments,
+            f'{comments}{review.comments.first().id}/',
+        )
+
+    def test_same_json_as_serializers(self, catalog, settings):
+        for url in self.urls(*catalog):
+            assert self.fetch(settings, url, True) == self.fetch(
+                settings, url, False), (
+                f'Проверьте, что быстрый путь для {url} отдаёт тот же JSON, '
+                'что и сериализатор'
+            )
+
+    def test_not_found(self, catalog, settings):
+        settings.FAST_READ_PATH = True
+        title, review = catalog
+        client = APIClient()
+        assert client.get('/api/v1/titles/0/').status_code == 404
+        assert client.get(
+            f'/api/v1/titles/{title.id}/reviews/0/').status_code == 404
+
+    def test_list_queries(self, catalog, settings,
+                          django_assert_num_queries):
+        settings.FAST_READ_PATH = True
+        # count + строки произведений + жанры страницы
+        with django_assert_num_queries(3):
+            APIClient().get('/api/v1/titles/')
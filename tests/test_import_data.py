@@ -0,0 +1,92 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from reviews.models import Comment, Review, Title
+
+
+@pytest.fixture
+def source(tmp_path):
+    files = {
+        'users.csv': 'username,email\nalice,alice@ya.ru\nbob,bob@ya.ru\n',
+        'category.csv': 'name,slug\nКниги,books\n',
+        'genre.csv': 'name,slug\nДрама,drama\nРок,rock\n',
+        'titles.csv': (
+            'id,name,year,category,genre\n'
+            '10,Книга,1999,books,"drama,rock"\n'
+            '11,Без жанра,2001,books,\n'
+        ),
+        'review.jsonl': '\n'.join(json.dumps(row) for row in (
+            {'id': 20, 'title_id': 10, 'text': '+', 'author': 'alice',
+             'score': 9, 'pub_date': '2020-01-01T10:00:00'},
+            {'id': 21, 'title_id': 10, 'text': '-', 'author': 'bob',
+             'score': 4, 'pub_date': '2021-03-04'},
+            {'id': 22, 'title_id': 99, 'text': '?', 'author': 'bob',
+             'score': 4},
+        )),
+        'comments.csv': (
+            'id,review_id,text,author\n'
+            '30,20,Согласен,bob\n'
+            '31,22,К пропущенному отзыву,bob\n'
+            '32,99,К неизвестному отзыву,alice\n'
+        ),
+    }
+    for name, content in files.items():
+        (tmp_path / name).write_text(content, encoding='utf-8')
+    return tmp_path
+
+
+@pytest.mark.django_db
+class TestImportData:
+
+    def test_import(self, source):
+        call_command('import_data', str(source), '--chunk-size=1')
+        title = Title.objects.get(pk=10)
+        assert title.category.slug == 'books'
+        assert sorted(title.genre.values_list('slug', flat=True)) == [
+            'drama', 'rock']
+        assert title.rating == 6 and title.reviews_count == 2, (
+            'Проверьте, что после загрузки пересчитываются рейтинги'
+        )
+        assert Review.objects.get(pk=20).pub_date.year == 2020
+        assert Review.objects.get(pk=21).pub_date.isoformat().startswith(
+            '2021-03-04T00:00:00'), (
+            'Проверьте, что дата без времени загружается как полночь'
+        )
+        assert not Review.objects.filter(pk=22).exists(), (
+            'Проверьте, что строки с неизвестными ссылками пропускаются'
+        )
+        assert Comment.objects.get(pk=30).author.username == 'bob'
+        assert list(Comment.objects.values_list('pk', flat=True)) == [30], (
+            'Проверьте, что комментарии к незагруженным отзывам пропускаются'
+        )
+
+    def test_resume_is_idempotent(self, source):
+        call_command('import_data', str(source))
+        Title.objects.filter(pk=11).delete()
+        (source / '.import_state.json').write_text(json.dumps({
+            'users': 2, 'category': 1, 'genre': 2, 'titles': 1,
+            'review': 3, 'comments': 3,
+        }))
+        out = StringIO()
+        call_command('import_data', str(source), '--resume', stdout=out)
+        assert Title.objects.filter(pk=11).exists()
+        assert 'users:' not in out.getvalue(), (
+            'Проверьте, что при --resume загруженные строки пропускаются'
+        )
+        call_command('import_data', str(source))
+        assert Title.objects.count() == 2
+        assert Review.objects.count() == 2
+
+    @pytest.mark.parametrize('name, content', (
+        ('review.jsonl', json.dumps({
+            'id': 20, 'title_id': 10, 'text': '+', 'author': 'alice',
+            'score': 9, 'pub_date': 'вчера'})),
+        ('comments.csv', 'review_id,text,author\n20,Да,bob\n'),
+    ), ids=('bad_date', 'comment_without_id'))
+    def test_bad_rows(self, source, name, content):
+        (source / name).write_text(content, encoding='utf-8')
+        with pytest.raises(CommandError, match=f'{name}, запись 1'):
+            call_command('import_data', str(source), stdout=StringIO())
@@ -0,0 +1,126 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from reviews import rankings
+from reviews.models import Category, Genre, Title, TitleRanking, User
+
+URL = '/api/v1/leaderboards/'
+
+
+def post_review(title, username, score):
+    user = User.objects.create(username=username, email=f'{username}@ya.ru')
+    client = APIClient()
+    client.force_authenticate(user)
+    response = client.post(
+        f'/api/v1/titles/{title.id}/reviews/', {'text': '-', 'score': score})
+    assert response.status_code == 201
+
+
+def leaderboard(**params):
+    response = APIClient().get(URL, params)
+    assert response.status_code == 200
+    return [(row['position'], row['title']['id']) for row in response.data]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLeaderboards:
+
+    def test_updated_from_review_writes(self):
+        rock = Genre.objects.create(name='Рок', slug='rock')
+        good = Title.objects.create(name='Хорошая', year=2000)
+        good.genre.set([rock])
+        bad = Title.objects.create(name='Плохая', year=2000)
+        post_review(good, 'first', 9)
+        post_review(bad, 'second', 3)
+        post_review(bad, 'third', 5)
+        assert leaderboard() == [(1, good.id), (2, bad.id)], (
+            'Проверьте, что топ по оценке обновляется после отзыва'
+        )
+        assert leaderboard(kind='reviews') == [(1, bad.id), (2, good.id)]
+        assert leaderboard(genre='rock') == [(1, good.id)], (
+            'Проверьте топ внутри жанра'
+        )
+        assert leaderboard(limit=1) == [(1, good.id)]
+
+    def test_weighted_needs_refresh_job(self, settings):
+        settings.LEADERBOARD_MIN_VOTES = 2
+        single = Title.objects.create(name='Один отзыв', year=2000)
+        many = Title.objects.create(name='Много отзывов', year=2000)
+        poor = Title.objects.create(name='Слабая', year=2000)
+        post_review(single, 'a', 10)
+        for i in range(4):
+            post_review(many, f'many{i}', 9)
+            post_review(poor, f'poor{i}', 1)
+        assert leaderboard(kind='weighted') == []
+        call_command('refresh_leaderboards', kind=['weighted'])
+        assert leaderboard(kind='weighted') == [
+            (1, many.id), (2, single.id), (3, poor.id)
+        ], (
+            'Проверьте, что байесовская оценка поднимает произведение '
+            'с большим числом отзывов'
+        )
+
+    def test_served_in_one_query(self, django_assert_num_queries):
+        title = Title.objects.create(name='Книга', year=2000)
+        post_review(title, 'reader', 7)
+        assert TitleRanking.objects.filter(scope='all').count() == 2
+        with django_assert_num_queries(1):
+            assert APIClient().get(URL).status_code == 200
+
+    def test_long_slugs(self):
+        slug = 's' * 100
+        genre = Genre.objects.create(name='Жанр', slug=slug)
+        category = Category.objects.create(name='Категория', slug=slug)
+        title = Title.objects.create(
+            name='Книга', year=2000, category=category)
+        title.genre.set([genre])
+        post_review(title, 'reader', 7)
+        assert leaderboard(category=slug) == [(1, title.id)], (
+            'Проверьте, что рейтинг строится для slug из 100 символов'
+        )
+        assert leaderboard(genre=slug) == [(1, title.id)]
+
+    def test_review_updates_rows_in_place(self, settings):
+        settings.LEADERBOARD_SIZE = 2
+        first = Title.objects.create(name='Первая', year=2000)
+        second = Title.objects.create(name='Вторая', year=2000)
+        third = Title.objects.create(name='Третья', year=2000)
+        post_review(first, 'a', 5)
+        post_review(second, 'b', 6)
+        rows = set(TitleRanking.objects.values_list('pk', flat=True))
+        post_review(first, 'c', 9)
+        assert set(TitleRanking.objects.values_list('pk', flat=True)) == (
+            rows), (
+            'Проверьте, что отзыв меняет только место своего '
+            'произведения, а не пересоздаёт весь топ'
+        )
+        assert leaderboard() == [(1, first.id), (2, second.id)]
+        post_review(third, 'd', 8)
+        assert leaderboard() == [(1, third.id), (2, first.id)], (
+            'Проверьте, что последнее место вытесняется из полного топа'
+        )
+        assert TitleRanking.objects.filter(
+            kind=TitleRanking.RATING, scope='all').count() == 2
+
+    def test_review_queries_do_not_grow_with_scopes(self):
+        genres = [
+            Genre.objects.create(name=f'Жанр {i}', slug=f'genre{i}')
+            for i in range(5)
+        ]
+        counts = []
+        for count in (1, 5):
+            title = Title.objects.create(name=f'Книга {count}', year=2000)
+            title.genre.set(genres[:count])
+            post_review(title, f'first{count}', 5)
+            post_review(title, f'second{count}', 9)
+            with CaptureQueriesContext(connection) as context:
+                rankings.refresh_title(title.id)
+            counts.append(len(context.captured_queries))
+        assert counts[0] == counts[1], (
+            'Проверьте, что обновление топов после отзыва не делает '
+            'запросов на каждую область произведения'
+        )
+        assert leaderboard(genre='genre4') == [(1, title.id)]
@@ -0,0 +1,101 @@
+import smtplib
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from reviews.models import MailMessage
+
+
+class BrokenBackend:
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def open(self):
+        raise smtplib.SMTPServerDisconnected('нет соединения')
+
+    def close(self):
+        pass
+
+
+class FlakyBackend(EmailBackend):
+    '''Падает не SMTP-ошибкой на одном адресе и проверяет,
+    что письма захвачены до отправки.'''
+
+    def send_messages(self, messages):
+        for message in messages:
+            row = MailMessage.objects.get(recipient=message.to[0])
+            assert row.attempts == 1 and row.next_attempt_at > timezone.now()
+            if message.to[0] == 'bad@ya.ru':
+                raise ValueError('битый заголовок')
+        return super().send_messages(messages)
+
+
+@pytest.mark.django_db
+class TestMailQueue:
+
+    def test_sign_up_enqueues_mail(self, mailoutbox):
+        response = APIClient().post(
+            '/api/v1/auth/signup/',
+            {'username': 'newbie', 'email': 'newbie@ya.ru'}
+        )
+        assert response.status_code == 200
+        assert not mailoutbox, (
+            'Проверьте, что регистрация не отправляет письмо синхронно'
+        )
+        assert MailMessage.objects.filter(recipient='newbie@ya.ru').exists()
+
+        call_command('send_mail_queue', '--once')
+        assert len(mailoutbox) == 1
+        assert mailoutbox[0].to == ['newbie@ya.ru']
+        assert not MailMessage.objects.exists(), (
+            'Проверьте, что отправленные письма удаляются из очереди'
+        )
+
+    def test_failed_delivery_is_retried_later(self, settings, mailoutbox):
+        settings.EMAIL_BACKEND = 'tests.test_mail_queue.BrokenBackend'
+        message = MailMessage.objects.create(
+            subject='Токен', body='-', from_email='admin@ya.ru',
+            recipient='user@ya.ru'
+        )
+        call_command('send_mail_queue', '--once')
+        message.refresh_from_db()
+        assert message.attempts == 1
+        assert 'нет соединения' in message.last_error
+        assert message.next_attempt_at is not None
+
+        settings.MAIL_QUEUE_MAX_ATTEMPTS = 2
+        MailMessage.objects.update(next_attempt_at=timezone.now())
+        call_command('send_mail_queue', '--once')
+        message.refresh_from_db()
+        assert message.attempts == 2
+        assert message.next_attempt_at is None, (
+            'Проверьте, что письмо больше не отправляется после всех попыток'
+        )
+        assert not mailoutbox
+
+    def test_failure_does_not_resend_batch(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_mail_queue.FlakyBackend'
+        for recipient in ('first@ya.ru', 'bad@ya.ru', 'last@ya.ru'):
+            MailMessage.objects.create(
+                subject='Токен', body='-', from_email='admin@ya.ru',
+                recipient=recipient
+            )
+        call_command('send_mail_queue', '--once')
+        assert sorted(email.to[0] for email in mail.outbox) == [
+            'first@ya.ru', 'last@ya.ru'], (
+            'Проверьте, что ошибка в одном письме не мешает отправке '
+            'остальных'
+        )
+        message = MailMessage.objects.get()
+        assert message.recipient == 'bad@ya.ru', (
+            'Проверьте, что отправленные письма удаляются из очереди, '
+            'даже если другое письмо пачки не отправилось'
+        )
+        assert message.attempts == 1
+        assert 'битый заголовок' in message.last_error
+        assert message.next_attempt_at > timezone.now()
@@ -0,0 +1,81 @@
+import time
+
+import pytest
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from api.metrics import registry
+from api.permissions import IsAdminSuperOrReadOnly
+from reviews.models import Category, Title, User
+
+
+@pytest.fixture
+def sample_all(settings):
+    settings.METRICS_SAMPLE_RATE = 1
+    registry.reset()
+    yield
+    registry.reset()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('sample_all')
+class TestMetrics:
+
+    def test_server_timing_and_histograms(self):
+        Title.objects.create(name='Книга', year=2000)
+        response = APIClient().get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert response['Server-Timing'].startswith('db;dur='), (
+            'Проверьте, что ответ API содержит заголовок Server-Timing'
+        )
+        metrics = registry.snapshot()['GET api:title-list']
+        assert metrics['total_ms']['count'] == 1
+        assert metrics['queries']['sum'] == 3, (
+            'Проверьте, что считаются SQL-запросы к базе'
+        )
+        assert metrics['size_kb']['sum'] == pytest.approx(
+            len(response.content) / 1024, abs=1e-3)
+
+    def test_serialize_time_is_measured(self, monkeypatch):
+        Category.objects.create(name='Книги', slug='books')
+        Category.objects.create(name='Фильмы', slug='films')
+
+        def slow(check):
+            def wrapper(*args, **kwargs):
+                time.sleep(0.01)
+                return check(*args, **kwargs)
+            return wrapper
+
+        monkeypatch.setattr(
+            IsAdminSuperOrReadOnly, 'has_permission',
+            slow(IsAdminSuperOrReadOnly.has_permission))
+        monkeypatch.setattr(
+            serializers.Serializer, 'to_representation',
+            slow(serializers.Serializer.to_representation))
+        assert APIClient().get('/api/v1/categories/').status_code == 200
+        metrics = registry.snapshot()['GET api:categories-list']
+        assert 20 <= metrics['serialize_ms']['sum'] < 30, (
+            'Проверьте, что serialize_ms - время сериализатора, '
+            'без проверки прав и других этапов запроса'
+        )
+
+    def test_sampling_disabled(self, settings):
+        settings.METRICS_SAMPLE_RATE = 0
+        response = APIClient().get('/api/v1/titles/')
+        assert 'Server-Timing' not in response
+        assert registry.snapshot() == {}
+
+    def test_metrics_endpoint_for_admin_only(self):
+        admin = User.objects.create(
+            username='admin', email='admin@ya.ru', role='admin')
+        client = APIClient()
+        assert client.get('/api/v1/metrics/').status_code == 401
+        client.force_authenticate(admin)
+        client.get('/api/v1/categories/')
+        response = client.get('/api/v1/metrics/')
+        assert response.status_code == 200
+        assert list(response.data['endpoints']) == [
+            'GET api:categories-list'
+        ], (
+            'Проверьте, что сам endpoint метрик не попадает в метрики'
+        )
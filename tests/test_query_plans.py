@@ -0,0 +1,28 @@
+import pytest
+from django.db import connection
+
+from api import benchmark
+from reviews import rankings
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='EXPLAIN в формате JSON и планировщик PostgreSQL'
+)
+@pytest.mark.django_db
+class TestQueryPlans:
+
+    def test_main_queries_use_indexes(self):
+        data = benchmark.seed('medium')
+        # в тесте on_commit не выполняется, топы строятся явно
+        rankings.refresh_all()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        plans = benchmark.run_plans(data)
+        assert set(plans) == {name for name, _, _ in benchmark.PLAN_CHECKS}
+        for name, result in plans.items():
+            assert not result['problems'], (
+                f'Проверьте индексы для {name}: в плане '
+                f'{" > ".join(result["plan"])} есть '
+                f'{", ".join(result["problems"])}'
+            )
@@ -0,0 +1,112 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from rest_framework.test import APIClient
+
+from reviews.models import Review, Title, User
+
+
+def rating(title):
+    title.refresh_from_db()
+    return title.rating, title.score_sum, title.reviews_count
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    @pytest.fixture
+    def title(self):
+        return Title.objects.create(name='Книга', year=2000)
+
+    @pytest.fixture
+    def authors(self):
+        return [
+            User.objects.create(username=f'user{i}', email=f'{i}@ya.ru')
+            for i in range(2)
+        ]
+
+    def post_review(self, user, title, score):
+        response = client_for(user).post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            {'text': '-', 'score': score})
+        assert response.status_code == 201
+        return response.data['id']
+
+    def test_api_review_changes(self, title, authors):
+        first = self.post_review(authors[0], title, 8)
+        self.post_review(authors[1], title, 3)
+        assert rating(title) == (5, 11, 2), (
+            'Проверьте, что новый отзыв учитывается в рейтинге'
+        )
+        url = f'/api/v1/titles/{title.id}/reviews/{first}/'
+        response = client_for(authors[0]).patch(url, {'score': 10})
+        assert response.status_code == 200
+        assert rating(title) == (6, 13, 2), (
+            'Проверьте, что изменение оценки учитывается в рейтинге'
+        )
+        assert client_for(authors[0]).delete(url).status_code == 204
+        assert rating(title) == (3, 3, 1), (
+            'Проверьте, что удалённый отзыв вычитается из рейтинга'
+        )
+
+    def test_author_deleted(self, title, authors):
+        self.post_review(authors[0], title, 8)
+        self.post_review(authors[1], title, 3)
+        admin = User.objects.create(
+            username='admin', email='admin@ya.ru', role='admin')
+        response = client_for(admin).delete(
+            f'/api/v1/users/{authors[0].username}/')
+        assert response.status_code == 204
+        assert rating(title) == (3, 3, 1), (
+            'Проверьте, что отзывы удалённого пользователя вычитаются '
+            'из рейтинга'
+        )
+
+    def test_admin_changes(self, title, authors):
+        other = Title.objects.create(name='Другая', year=2000)
+        review = Review.objects.create(
+            title=title, author=authors[0], text='-', score=8)
+        Title.objects.rebuild_rating()
+        admin = User.objects.create_superuser(
+            username='root', email='root@ya.ru', password='-')
+        client = Client()
+        client.force_login(admin)
+        url = f'/admin/reviews/review/{review.pk}/'
+        response = client.post(f'{url}change/', {
+            'title': other.pk, 'author': authors[0].pk,
+            'text': '-', 'score': 6})
+        assert response.status_code == 302
+        assert rating(title) == (None, 0, 0)
+        assert rating(other) == (6, 6, 1), (
+            'Проверьте, что правка отзыва в админке пересчитывает рейтинг'
+        )
+        response = client.post(f'{url}delete/', {'post': 'yes'})
+        assert response.status_code == 302
+        assert rating(other) == (None, 0, 0), (
+            'Проверьте, что удаление отзыва в админке учитывается '
+            'в рейтинге'
+        )
+
+    def test_rebuild_ratings(self, title, authors):
+        for author, score in zip(authors, (9, 4)):
+            Review.objects.create(
+                title=title, author=author, text='-', score=score)
+        empty = Title.objects.create(name='Без отзывов', year=2000)
+        Title.objects.filter(pk=empty.pk).update(
+            rating=1, score_sum=1, reviews_count=1)
+        call_command('rebuild_ratings', batch_size=1, stdout=StringIO())
+        assert rating(title) == (6, 13, 2), (
+            'Проверьте, что rebuild_ratings пересчитывает рейтинг по отзывам'
+        )
+        assert rating(empty) == (None, 0, 0), (
+            'Проверьте, что rebuild_ratings обнуляет рейтинг '
+            'без отзывов'
+        )
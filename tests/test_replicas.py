@@ -0,0 +1,143 @@
+import pytest
+from django.db import OperationalError
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+
+from api import routers
+from api.authentication import RoleAccessToken
+from api.middleware import ReplicaRoutingMiddleware
+from reviews.models import Title, User
+
+
+@pytest.fixture
+def replica(settings):
+    # вторая база - та же тестовая, важно лишь, куда ушло чтение
+    settings.DB_REPLICAS = ['default']
+    routers._down_until.clear()
+    yield 'default'
+    routers._down_until.clear()
+
+
+@pytest.mark.django_db
+class TestReplicas:
+
+    def test_router(self):
+        router = routers.ReplicaRouter()
+        assert router.db_for_read(User) is None
+        routers.set_read_database('replica1')
+        try:
+            assert router.db_for_read(User) == 'replica1'
+            assert router.db_for_write(User) == 'default', (
+                'Проверьте, что запись всегда идёт в основную базу'
+            )
+        finally:
+            routers.set_read_database(None)
+        assert router.allow_migrate('default', 'reviews')
+        assert not router.allow_migrate('replica1', 'reviews')
+
+    def test_safe_requests_read_from_replica(self, replica):
+        user = User.objects.create_user(username='reader', email='r@ya.ru')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert response.wsgi_request.read_database == replica, (
+            'Проверьте, что GET к произведениям читает из реплики'
+        )
+        assert 'ETag' not in response, (
+            'Проверьте, что ответ из реплики не получает ETag текущей '
+            'версии данных'
+        )
+        assert routers.read_database() is None, (
+            'Проверьте, что выбор реплики сбрасывается после запроса'
+        )
+
+    def test_response_cache_filled_from_primary(self, replica):
+        response = APIClient().get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert response.wsgi_request.read_database is None, (
+            'Проверьте, что кэш ответов заполняется из основной базы'
+        )
+        assert 'ETag' in response
+
+    def test_other_views_read_from_primary(self, replica):
+        user = User.objects.create_user(username='reader', email='r@ya.ru')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.wsgi_request.read_database is None
+
+    def token_client(self, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RoleAccessToken.for_user(user)}')
+        return client
+
+    def test_read_your_writes(self, replica):
+        admin = User.objects.create_user(
+            username='admin', email='admin@ya.ru', role='admin')
+        writer = self.token_client(admin)
+        response = writer.post(
+            '/api/v1/categories/', {'name': 'Фильм', 'slug': 'movie'})
+        assert response.status_code == 201
+        response = writer.get('/api/v1/titles/')
+        assert response.wsgi_request.read_database is None, (
+            'Проверьте, что после записи клиент читает из основной базы'
+        )
+        reader = self.token_client(
+            User.objects.create_user(username='reader', email='r@ya.ru'))
+        response = reader.get('/api/v1/titles/')
+        assert response.wsgi_request.read_database == replica, (
+            'Проверьте, что остальные клиенты читают из реплики'
+        )
+
+    def test_anonymous_writes_do_not_pin_reads(self, replica):
+        title = Title.objects.create(name='Книга', year=2000)
+        response = APIClient().post(
+            '/api/v1/auth/signup/',
+            {'username': 'newbie', 'email': 'newbie@ya.ru'})
+        assert response.status_code == 200
+        # тот же REMOTE_ADDR, как у всех клиентов за nginx
+        response = APIClient().get(f'/api/v1/titles/{title.id}/reviews/')
+        assert response.wsgi_request.read_database == replica, (
+            'Проверьте, что запись анонимного клиента не переводит '
+            'чтение других клиентов с тем же адресом на основную базу'
+        )
+
+    def test_sticky_key(self):
+        factory = RequestFactory()
+        key = ReplicaRoutingMiddleware.sticky_key
+        assert key(factory.get('/', HTTP_X_FORWARDED_FOR='10.0.0.1')) is None
+        assert key(factory.get(
+            '/', HTTP_AUTHORIZATION='Bearer a',
+            HTTP_X_FORWARDED_FOR='10.0.0.1')) == key(factory.get(
+                '/', HTTP_AUTHORIZATION='Bearer a',
+                HTTP_X_FORWARDED_FOR='10.0.0.2')), (
+            'Проверьте, что клиент определяется по Authorization, '
+            'а не по X-Forwarded-For'
+        )
+
+    def test_unavailable_replica(self, replica, settings, monkeypatch):
+        calls = []
+
+        class Unreachable:
+            def ensure_connection(self):
+                calls.append(1)
+                raise OperationalError('could not connect to server')
+
+        settings.DB_REPLICAS = ['replica1']
+        monkeypatch.setattr(routers, 'connections', {
+            'replica1': Unreachable()})
+        client = APIClient()
+        for _ in range(2):
+            response = client.get('/api/v1/genres/')
+            assert response.status_code == 200
+            assert response.wsgi_request.read_database is None, (
+                'Проверьте, что при недоступной реплике чтение идёт '
+                'в основную базу'
+            )
+        assert len(calls) == 1, (
+            'Проверьте, что недоступная реплика не опрашивается '
+            'на каждом запросе'
+        )
@@ -0,0 +1,63 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework.validators import UniqueTogetherValidator
+
+from reviews.models import Review, Title, User
+
+
+def add_reviews(title, count):
+    start = Review.objects.count()
+    for i in range(start, start + count):
+        user = User.objects.create(username=f'user{i}', email=f'{i}@ya.ru')
+        Review.objects.create(title=title, author=user, text='-', score=5)
+
+
+def queries_with_table(context, table):
+    return sum(
+        f'FROM "{table}"' in query['sql']
+        for query in context.captured_queries
+    )
+
+
+@pytest.mark.django_db
+class TestReviewQueries:
+
+    def test_list_queries_do_not_grow(self):
+        title = Title.objects.create(name='Книга', year=2000)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        counts = []
+        for count in (1, 4):
+            add_reviews(title, count)
+            with CaptureQueriesContext(connection) as context:
+                assert APIClient().get(url).status_code == 200
+            counts.append(len(context.captured_queries))
+        assert counts == [3, 3], (
+            'Проверьте, что список отзывов загружается за постоянное '
+            'число запросов: произведение, количество и страница'
+        )
+
+    def test_create_fetches_title_once(self):
+        user = User.objects.create(username='author', email='a@ya.ru')
+        title = Title.objects.create(name='Книга', year=2000)
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(url, {'text': 'Да', 'score': 8})
+        assert response.status_code == 201
+        assert queries_with_table(context, 'reviews_title') == 1, (
+            'Проверьте, что произведение загружается один раз за запрос'
+        )
+        assert queries_with_table(context, 'reviews_review') == 0, (
+            'Проверьте, что уникальность отзыва не проверяется '
+            'отдельным запросом'
+        )
+        response = client.post(url, {'text': 'Ещё', 'score': 1})
+        assert response.status_code == 400
+        assert response.data == {'non_field_errors': [
+            UniqueTogetherValidator.message.format(field_names='title, author')
+        ]}, 'Проверьте, что ответ на повторный отзыв не изменился'
+        title.refresh_from_db()
+        assert (title.rating, title.reviews_count) == (8, 1)
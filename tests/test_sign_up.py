@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from reviews.models import MailMessage, User
+
+URL = '/api/v1/auth/signup/'
+TRANSACTION_CONTROL = ('BEGIN', 'SAVEPOINT', 'RELEASE', 'ROLLBACK')
+
+
+def sign_up(data):
+    try:
+        return APIClient().post(URL, data).status_code
+    finally:
+        connection.close()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSignUp:
+
+    def test_sign_up_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().post(
+                URL, {'username': 'user', 'email': 'user@ya.ru'})
+        statements = [
+            query['sql'] for query in context.captured_queries
+            if not query['sql'].startswith(TRANSACTION_CONTROL)
+        ]
+        # INSERT пользователя и INSERT письма в очередь
+        assert len(statements) == 2, (
+            'Проверьте, что регистрация не делает лишних запросов к БД'
+        )
+        assert response.status_code == 200
+        assert response.data == {'username': 'user', 'email': 'user@ya.ru'}
+
+    @pytest.mark.parametrize('data', (
+        {'username': 'user', 'email': 'other@ya.ru'},
+        {'username': 'other', 'email': 'user@ya.ru'},
+        {'username': 'user', 'email': 'user@ya.ru'},
+    ))
+    def test_sign_up_taken(self, data):
+        APIClient().post(URL, {'username': 'user', 'email': 'user@ya.ru'})
+        response = APIClient().post(URL, data)
+        assert response.status_code == 400, (
+            'Проверьте, что занятые username или email возвращают 400'
+        )
+        assert User.objects.count() == 1
+        assert MailMessage.objects.count() == 1
+
+    @pytest.mark.skipif(
+        connection.vendor == 'sqlite',
+        reason='SQLite блокирует таблицу целиком при параллельной записи'
+    )
+    def test_parallel_sign_up_same_username(self):
+        requests = [
+            {'username': 'racer', 'email': f'racer{i}@ya.ru'}
+            for i in range(8)
+        ]
+        with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+            statuses = list(executor.map(sign_up, requests))
+        assert sorted(statuses) == [200] + [400] * (len(requests) - 1), (
+            'Проверьте, что из параллельных регистраций с одним username '
+            'успешна ровно одна'
+        )
+        assert User.objects.filter(username='racer').count() == 1
+        assert MailMessage.objects.count() == 1
@@ -0,0 +1,109 @@
+import datetime
+import decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api import renderers
+from reviews.models import Category, Genre, Title, User
+
+DATA = {
+    'text': 'Тихий Дон\u2028\u2029',
+    'date': datetime.datetime(2022, 1, 2, 3, 4, 5, 678901),
+    'price': decimal.Decimal('1.50'),
+    'lazy': gettext_lazy('Not found.'),
+    'items': [1, None, True, 2.5],
+}
+
+
+@pytest.fixture
+def titles():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    for i in range(3):
+        title = Title.objects.create(
+            name=f'Произведение {i}', year=2000, category=category,
+            description='Описание')
+        title.genre.set([genre])
+
+
+class TestFastJSONRenderer:
+
+    def test_same_output_as_json_renderer(self):
+        assert renderers.FastJSONRenderer().render(DATA) == (
+            JSONRenderer().render(DATA)), (
+            'Проверьте, что рендерер отдаёт тот же JSON, что JSONRenderer'
+        )
+
+    def test_stdlib_fallback(self, monkeypatch):
+        monkeypatch.setattr(renderers, 'orjson', None)
+        assert renderers.FastJSONRenderer().render(DATA) == (
+            JSONRenderer().render(DATA))
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    @pytest.mark.parametrize('fast', (True, False))
+    def test_fields_and_exclude(self, titles, settings, fast):
+        settings.FAST_READ_PATH = fast
+        client = APIClient()
+        response = client.get('/api/v1/titles/?fields=name,id')
+        assert list(response.data['results'][0]) == ['id', 'name'], (
+            'Проверьте, что ?fields= оставляет только перечисленные поля'
+        )
+        response = client.get('/api/v1/titles/?exclude=description,genre')
+        assert list(response.data['results'][0]) == [
+            'id', 'category', 'rating', 'name', 'year']
+        title = Title.objects.first()
+        response = client.get(f'/api/v1/titles/{title.id}/?fields=year')
+        assert response.data == {'year': 2000}
+
+    @pytest.mark.parametrize('fast', (True, False))
+    def test_unknown_fields(self, titles, settings, fast):
+        settings.FAST_READ_PATH = fast
+        client = APIClient()
+        full = list(client.get('/api/v1/titles/').data['results'][0])
+        response = client.get('/api/v1/titles/?fields=foo')
+        assert list(response.data['results'][0]) == full, (
+            'Проверьте, что ?fields= только с неизвестными полями '
+            'отдаёт все поля'
+        )
+        response = client.get('/api/v1/titles/?fields=foo,name')
+        assert list(response.data['results'][0]) == ['name']
+
+    @pytest.mark.parametrize('fast', (True, False))
+    def test_columns_not_loaded(self, titles, settings, fast):
+        settings.FAST_READ_PATH = fast
+        with CaptureQueriesContext(connection) as context:
+            APIClient().get('/api/v1/titles/?exclude=description')
+        assert not any(
+            'description' in query['sql']
+            for query in context.captured_queries
+        ), 'Проверьте, что исключённые поля не читаются из базы'
+
+    def test_genres_query_skipped(self, titles, settings,
+                                  django_assert_num_queries):
+        settings.FAST_READ_PATH = True
+        # count + строки произведений, без запроса жанров
+        with django_assert_num_queries(2):
+            APIClient().get('/api/v1/titles/?fields=id,name')
+
+    def test_other_endpoints(self, titles):
+        response = APIClient().get('/api/v1/categories/?fields=slug')
+        assert response.data['results'] == [{'slug': 'movie'}]
+
+    def test_writes_ignore_fields(self):
+        admin = User.objects.create_user(
+            username='admin', email='admin@ya.ru', role='admin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.post(
+            '/api/v1/categories/?fields=slug',
+            {'name': 'Книга', 'slug': 'book'})
+        assert response.status_code == 201
+        assert response.data == {'name': 'Книга', 'slug': 'book'}
@@ -0,0 +1,91 @@
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from reviews.models import Title, User
+
+
+def get_token(user):
+    response = APIClient().post('/api/v1/auth/token/', {
+        'username': user.username,
+        'confirmation_code': default_token_generator.make_token(user),
+    })
+    assert response.status_code == 200
+    return response.data['token']
+
+
+def client_for(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.mark.django_db
+class TestStatelessAuth:
+
+    def test_write_without_user_query(self):
+        user = User.objects.create(username='author', email='a@ya.ru')
+        title = Title.objects.create(name='Книга', year=2000)
+        client = client_for(get_token(user))
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                f'/api/v1/titles/{title.id}/reviews/',
+                {'text': 'Отлично', 'score': 9}
+            )
+        assert response.status_code == 201
+        assert response.data['author'] == 'author'
+        assert not any(
+            'FROM "reviews_user"' in query['sql']
+            for query in context.captured_queries
+        ), 'Проверьте, что пользователь не загружается из БД на каждый запрос'
+
+    def test_admin_role_from_claims(self):
+        admin = User.objects.create(
+            username='admin', email='admin@ya.ru', role='admin')
+        response = client_for(get_token(admin)).post(
+            '/api/v1/genres/', {'name': 'Рок', 'slug': 'rock'})
+        assert response.status_code == 201
+
+    def test_role_change_revokes_token(self):
+        admin = User.objects.create(
+            username='admin', email='admin@ya.ru', role='admin')
+        client = client_for(get_token(admin))
+        admin.role = 'user'
+        admin.save()
+        response = client.post(
+            '/api/v1/genres/', {'name': 'Рок', 'slug': 'rock'})
+        assert response.status_code == 401, (
+            'Проверьте, что после смены роли старый токен не принимается'
+        )
+
+    def test_revocation_survives_cache_eviction(self):
+        admin = User.objects.create(
+            username='admin', email='admin@ya.ru', role='admin')
+        client = client_for(get_token(admin))
+        admin.role = 'user'
+        admin.save()
+        cache.clear()
+        response = client.post(
+            '/api/v1/genres/', {'name': 'Рок', 'slug': 'rock'})
+        assert response.status_code == 401, (
+            'Проверьте, что отзыв токенов хранится в БД, а не только в кэше'
+        )
+
+    def test_deleted_user_token_rejected(self):
+        user = User.objects.create(username='reader', email='r@ya.ru')
+        client = client_for(get_token(user))
+        user.delete()
+        cache.clear()
+        assert client.get('/api/v1/titles/').status_code == 401, (
+            'Проверьте, что токен удалённого пользователя не принимается'
+        )
+
+    def test_profile_change_keeps_token(self):
+        user = User.objects.create(username='reader', email='r@ya.ru')
+        client = client_for(get_token(user))
+        response = client.patch('/api/v1/users/me/', {'bio': 'Читатель'})
+        assert response.status_code == 200
+        assert client.get('/api/v1/users/me/').data['bio'] == 'Читатель'
@@ -0,0 +1,61 @@
+import pytest
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.throttling import ScopedRateThrottle
+
+
+class View:
+    throttle_scope = 'test'
+
+
+class Throttle(ScopedRateThrottle):
+    THROTTLE_RATES = {'test': '3/minute'}
+    now = 600.0
+
+    def timer(self):
+        return self.now
+
+
+def check(now):
+    request = Request(APIRequestFactory().get('/'))
+    Throttle.now = now
+    throttle = Throttle()
+    return throttle.allow_request(request, View()), request
+
+
+class TestSlidingWindowThrottle:
+
+    def test_limit_within_window(self):
+        assert [check(600 + i)[0] for i in range(4)] == [
+            True, True, True, False
+        ], 'Проверьте, что сверх лимита запросы отклоняются'
+        _, request = check(610)
+        assert request._request.rate_limit['remaining'] == 0
+
+    def test_previous_window_expires_gradually(self):
+        for i in range(3):
+            check(600 + i)
+        assert not check(665)[0], (
+            'Проверьте, что запросы предыдущего окна ещё учитываются'
+        )
+        allowed, request = check(700)
+        assert allowed, (
+            'Проверьте, что вклад предыдущего окна убывает со временем'
+        )
+        assert request._request.rate_limit['remaining'] == 1
+
+
+@pytest.mark.django_db
+class TestRateLimitHeaders:
+
+    def test_headers(self):
+        client = APIClient()
+        first = client.get('/api/v1/categories/')
+        second = client.get('/api/v1/categories/')
+        assert first['X-RateLimit-Limit'] == '1000'
+        assert int(first['X-RateLimit-Remaining']) == 999
+        assert int(second['X-RateLimit-Remaining']) == 998, (
+            'Проверьте, что остаток квоты уменьшается с каждым запросом'
+        )
+        assert int(first['X-RateLimit-Reset']) > 0
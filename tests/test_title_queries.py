@@ -0,0 +1,68 @@
+import pytest
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Genre, Title
+
+
+@pytest.fixture
+def titles():
+    categories = [
+        Category.objects.create(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(2)
+    ]
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(3)
+    ]
+    titles = []
+    for i in range(12):
+        title = Title.objects.create(
+            name=f'Произведение {i}',
+            year=2000 + i % 2,
+            category=categories[i % 2]
+        )
+        title.genre.set(genres[:1 + i % 3])
+        titles.append(title)
+    return titles
+
+
+@pytest.mark.django_db
+class TestTitleQueries:
+    # count + выборка произведений с категорией + prefetch жанров
+    list_queries = 3
+
+    @pytest.mark.parametrize('limit', (1, 5, 12))
+    def test_list_queries(self, titles, limit, django_assert_num_queries):
+        client = APIClient()
+        with django_assert_num_queries(self.list_queries):
+            response = client.get(f'/api/v1/titles/?limit={limit}')
+        assert response.status_code == 200
+        assert len(response.data['results']) == limit, (
+            'Проверьте, что пагинация списка произведений работает'
+        )
+
+    def test_detail_queries(self, titles, django_assert_num_queries):
+        client = APIClient()
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{titles[0].id}/')
+        assert response.status_code == 200
+        assert response.data['category'] == {
+            'name': 'Категория 0', 'slug': 'category-0'
+        }
+
+    @pytest.mark.parametrize('query', (
+        'genre=genre-0',
+        'category=category-1',
+        'name=Произведение 1',
+        'year=2001',
+        'genre=genre-2&category=category-1&year=2001',
+    ))
+    def test_filtered_list_queries(self, titles, query,
+                                   django_assert_num_queries):
+        client = APIClient()
+        with django_assert_num_queries(self.list_queries):
+            response = client.get(f'/api/v1/titles/?{query}&limit=20')
+        assert response.status_code == 200
+        assert response.data['results'], (
+            f'Проверьте, что фильтр `{query}` возвращает произведения'
+        )
@@ -0,0 +1,75 @@
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api import search
+from api.search import InvertedIndex
+from reviews.models import Review, Title, User
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def test_search_by_name_and_description(self):
+        in_name = Title.objects.create(
+            name='Мастер и Маргарита', year=1967)
+        in_description = Title.objects.create(
+            name='Собачье сердце', year=1925,
+            description='Повесть, которую мастер написал до романа')
+        Title.objects.create(name='Белая гвардия', year=1925)
+        response = APIClient().get('/api/v1/titles/', {'search': 'мастер'})
+        assert response.status_code == 200
+        ids = [title['id'] for title in response.data['results']]
+        assert ids == [in_name.id, in_description.id], (
+            'Проверьте, что поиск идёт по названию и описанию, '
+            'а совпадения в названии выше по релевантности'
+        )
+
+    def test_search_by_prefixes_of_all_words(self):
+        title = Title.objects.create(name='Война и мир', year=1869)
+        Title.objects.create(name='Мир полудня', year=1962)
+        response = APIClient().get('/api/v1/titles/', {'search': 'войн ми'})
+        assert [item['id'] for item in response.data['results']] == [
+            title.id
+        ], 'Проверьте, что ищутся произведения со всеми словами запроса'
+
+
+@pytest.mark.skipif(
+    connection.vendor == 'postgresql',
+    reason='на PostgreSQL поиск идёт по search_vector'
+)
+@pytest.mark.django_db(transaction=True)
+class TestSearchIndexVersion:
+
+    def find(self, text):
+        response = APIClient().get('/api/v1/titles/', {'search': text})
+        return [item['id'] for item in response.data['results']]
+
+    def test_reviews_do_not_rebuild_index(self):
+        title = Title.objects.create(name='Пикник на обочине', year=1972)
+        assert self.find('пикник') == [title.id]
+        index = search._index['index']
+        user = User.objects.create(username='reader', email='r@ya.ru')
+        Review.objects.create(title=title, author=user, text='-', score=9)
+        assert self.find('пикник') == [title.id]
+        assert search._index['index'] is index, (
+            'Проверьте, что отзыв не перестраивает поисковый индекс'
+        )
+        title.name = 'Улитка на склоне'
+        title.save()
+        assert self.find('улитка') == [title.id], (
+            'Проверьте, что индекс обновляется при изменении произведения'
+        )
+
+
+class TestInvertedIndex:
+
+    def test_prefix_and_weights(self):
+        index = InvertedIndex([
+            (1, 'Дюна', None),
+            (2, 'Мессия Дюны', 'Продолжение романа'),
+            (3, 'Солярис', 'Роман о дюнах'),
+        ])
+        assert index.search(['дюн']) == {1: 2, 2: 2, 3: 1}
+        assert index.search(['дюн', 'роман']) == {2: 3, 3: 2}
+        assert index.search(['нет']) == {}